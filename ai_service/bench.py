@@ -0,0 +1,443 @@
+"""Performance benchmarks for the AI service.
+
+Usage:
+    python bench.py retrieval [--queries FILE] [--live]
+    python bench.py routing --recorded FILE [--record] [--live]
+    python bench.py transport [--url URL] [--sessions 1000] [--server-pid PID]
+    python bench.py fuzzy [--intents 10000] [--queries FILE]
+
+The transport benchmark needs a running server plus the httpx and websockets packages,
+and a file descriptor limit above 2x --sessions (ulimit -n).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+
+from dotenv import load_dotenv
+from intent_matcher import FuzzyIntentIndex, normalize
+from knowledge_base import KNOWLEDGE_BASE, build_system_prompt, compact_snippet, kb_index
+from query_router import MODEL_TIERS, QUERY_CLASSES, classify_query, plan_query
+
+load_dotenv()
+
+SAMPLE_QUERIES = [
+    "what is the hostel fee",
+    "when is the last date for the second installment",
+    "am I eligible for exams if I paid half the fees",
+    "finance office phone number",
+    "can I get a refund",
+    "how do I pay with upi",
+    "my payment failed what should I do",
+    "how to download my receipt",
+    "is there a late fee",
+    "what is the bus fee",
+    "tell me about library dues",
+    "minimum attendance needed",
+    "bye",
+    "which courses does vignan offer",
+]
+
+# The prompt remote calls used before retrieval was added
+BLIND_PROMPT = """You are Vignan AI Assistant. Be conversational and helpful.
+User: {name}. Answer naturally and use emojis occasionally."""
+
+
+def load_queries(path):
+    """Read one query per line, or JSONL records with a "message" field"""
+    if not path:
+        return SAMPLE_QUERIES
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                queries.append(json.loads(line)["message"])
+            else:
+                queries.append(line)
+    return queries
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 chars per token) for offline comparisons"""
+    return max(1, len(text) // 4)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def live_completion(system_prompt, user_message, max_tokens=500, tier="fast", temperature=0.7):
+    """Call the first configured provider and return (latency_ms, prompt_tokens, completion_tokens, finish_reason)"""
+    import requests
+
+    if os.getenv("GROQ_API_KEY"):
+        url = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1") + "/chat/completions"
+        key, model = os.getenv("GROQ_API_KEY"), MODEL_TIERS["groq"][tier]
+    else:
+        url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1") + "/chat/completions"
+        key, model = os.getenv("OPENAI_API_KEY"), MODEL_TIERS["openai"][tier]
+
+    payload = {
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message},
+        ],
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    start = time.perf_counter()
+    response = requests.post(url, headers={"Authorization": f"Bearer {key}"}, json=payload, timeout=30)
+    latency_ms = (time.perf_counter() - start) * 1000
+    response.raise_for_status()
+    data = response.json()
+    usage = data["usage"]
+    return latency_ms, usage["prompt_tokens"], usage["completion_tokens"], data["choices"][0].get("finish_reason")
+
+
+def bench_retrieval(args):
+    queries = load_queries(args.queries)
+
+    # Retrieval latency
+    timings = []
+    for _ in range(args.iterations):
+        for query in queries:
+            start = time.perf_counter()
+            kb_index.search(query, k=args.top_k)
+            timings.append((time.perf_counter() - start) * 1_000_000)
+
+    print(f"📚 Knowledge base: {len(KNOWLEDGE_BASE)} entries, {len(kb_index.postings)} terms")
+    print(f"⏱️  Retrieval latency over {len(timings)} lookups: "
+          f"p50={percentile(timings, 50):.1f}µs p95={percentile(timings, 95):.1f}µs "
+          f"p99={percentile(timings, 99):.1f}µs")
+
+    # Prompt size: blind prompt vs whole knowledge base vs top-k retrieval
+    full_kb = BLIND_PROMPT + "\n" + "\n".join(
+        f"- {compact_snippet(key, text)}" for key, text in KNOWLEDGE_BASE.items()
+    )
+    blind = [estimate_tokens(BLIND_PROMPT + query) for query in queries]
+    stuffed = [estimate_tokens(full_kb + query) for query in queries]
+    grounded = [estimate_tokens(build_system_prompt(query, "friend", args.top_k) + query) for query in queries]
+    print("📝 Estimated prompt tokens per query (mean):")
+    print(f"   {'blind prompt':22s} {statistics.mean(blind):.0f} (no facts, answers are guesses)")
+    print(f"   {'whole knowledge base':22s} {statistics.mean(stuffed):.0f}")
+    print(f"   {f'top-{args.top_k} retrieval':22s} {statistics.mean(grounded):.0f}")
+
+    if not args.live:
+        return
+
+    # Real prompt/completion tokens and latency from the provider
+    results = {"blind": [], "grounded": []}
+    for query in queries:
+        results["blind"].append(live_completion(BLIND_PROMPT.format(name="friend"), query))
+        results["grounded"].append(live_completion(build_system_prompt(query, "friend", args.top_k), query))
+
+    print("🌐 Live provider results (mean):")
+    for label, rows in results.items():
+        latencies = [row[0] for row in rows]
+        print(f"   {label:9s} latency={statistics.mean(latencies):.0f}ms "
+              f"p95={percentile(latencies, 95):.0f}ms "
+              f"prompt_tokens={statistics.mean(row[1] for row in rows):.0f} "
+              f"completion_tokens={statistics.mean(row[2] for row in rows):.0f}")
+
+
+def record_queries(queries, path):
+    """Run queries live at the old fixed 500-token budget and save latency per answer length"""
+    with open(path, "w", encoding="utf-8") as f:
+        for query in queries:
+            latency_ms, prompt_tokens, completion_tokens, _ = live_completion(
+                build_system_prompt(query, "friend"), query, max_tokens=500
+            )
+            f.write(json.dumps({
+                "message": query,
+                "latency_ms": round(latency_ms, 1),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+            }) + "\n")
+    print(f"💾 Recorded {len(queries)} queries to {path}")
+
+
+def bench_routing(args):
+    if args.record:
+        record_queries(load_queries(args.queries), args.recorded)
+
+    with open(args.recorded, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records = [r for r in records if "latency_ms" in r and "completion_tokens" in r]
+    if len(records) < 2:
+        raise SystemExit("Need at least 2 recorded queries with latency_ms and completion_tokens")
+
+    # Latency model fitted on the recording: latency = base + per_token * completion_tokens
+    per_token, base = statistics.linear_regression(
+        [r["completion_tokens"] for r in records], [r["latency_ms"] for r in records]
+    )
+    print(f"📈 Fitted latency ≈ {base:.0f}ms + {per_token:.2f}ms/token over {len(records)} recorded queries")
+
+    by_class = {name: [] for name in QUERY_CLASSES}
+    for record in records:
+        by_class[classify_query(record["message"])].append(record)
+
+    # Upper bound: recorded answers cut at the budget, as if the model ignored the shorter
+    # style prompt and the tier change. --live measures what the plan actually does.
+    print("📐 Offline upper bound (assumes answers are truncated at the budget):")
+    print(f"{'class':10s} {'n':>5s} {'budget':>6s} {'tokens':>7s} {'capped':>7s} "
+          f"{'trunc%':>6s} {'lat_ms':>7s} {'bound_ms':>8s}")
+    all_baseline, all_adaptive = [], []
+    for name, rows in by_class.items():
+        if not rows:
+            continue
+        budget = QUERY_CLASSES[name]["max_tokens"]
+        tokens = [r["completion_tokens"] for r in rows]
+        capped = [min(t, budget) for t in tokens]
+        baseline = [r["latency_ms"] for r in rows]
+        # Keep the measured latency and subtract only the tokens the budget would cut off
+        adaptive = [r["latency_ms"] - per_token * (t - c) for r, t, c in zip(rows, tokens, capped)]
+        all_baseline += baseline
+        all_adaptive += adaptive
+        truncated = sum(1 for t in tokens if t > budget) / len(tokens) * 100
+        print(f"{name:10s} {len(rows):5d} {budget:6d} {statistics.mean(tokens):7.0f} "
+              f"{statistics.mean(capped):7.0f} {truncated:6.1f} {statistics.mean(baseline):7.0f} "
+              f"{statistics.mean(adaptive):8.0f}")
+
+    print(f"⏱️  Upper bound on mean latency {statistics.mean(all_baseline):.0f}ms → {statistics.mean(all_adaptive):.0f}ms, "
+          f"p95 {percentile(all_baseline, 95):.0f}ms → {percentile(all_adaptive, 95):.0f}ms "
+          f"(truncation only; style and model tier are not modelled)")
+
+    if args.live:
+        replay_plans(by_class)
+
+
+def replay_plans(by_class):
+    """Re-run the recorded queries live with their plan_query settings and measure the result"""
+    print("🌐 Live replay with per-class style, tier, temperature and max_tokens:")
+    print(f"{'class':10s} {'n':>5s} {'tier':>5s} {'rec_tok':>7s} {'live_tok':>8s} {'at_cap%':>7s} "
+          f"{'rec_ms':>7s} {'live_ms':>7s} {'live_p95':>8s}")
+    all_recorded, all_live = [], []
+    for name, rows in by_class.items():
+        if not rows:
+            continue
+        live = []
+        for record in rows:
+            plan = plan_query(record["message"])
+            live.append(live_completion(
+                build_system_prompt(record["message"], "friend", style=plan["style"]), record["message"],
+                max_tokens=plan["max_tokens"], tier=plan["tier"], temperature=plan["temperature"],
+            ))
+        recorded = [r["latency_ms"] for r in rows]
+        latencies = [row[0] for row in live]
+        at_cap = sum(1 for row in live if row[3] == "length") / len(live) * 100
+        all_recorded += recorded
+        all_live += latencies
+        print(f"{name:10s} {len(rows):5d} {QUERY_CLASSES[name]['tier']:>5s} "
+              f"{statistics.mean(r['completion_tokens'] for r in rows):7.0f} "
+              f"{statistics.mean(row[2] for row in live):8.0f} {at_cap:7.1f} "
+              f"{statistics.mean(recorded):7.0f} {statistics.mean(latencies):7.0f} "
+              f"{percentile(latencies, 95):8.0f}")
+
+    print(f"⏱️  Measured mean latency {statistics.mean(all_recorded):.0f}ms → {statistics.mean(all_live):.0f}ms, "
+          f"p95 {percentile(all_recorded, 95):.0f}ms → {percentile(all_live, 95):.0f}ms "
+          f"(at_cap% = answers that hit max_tokens and were cut off)")
+
+
+def server_cpu_seconds(pid):
+    """utime + stime of a process from /proc, or None when no pid is given"""
+    if not pid:
+        return None
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def rest_session(client, url, messages, latencies):
+    """Browser-like REST chat: CORS preflight plus POST per message on a keep-alive client"""
+    for i in range(messages):
+        start = time.perf_counter()
+        await client.options(f"{url}/api/chat", headers={
+            "Origin": "http://localhost:5173",
+            "Access-Control-Request-Method": "POST",
+            "Access-Control-Request-Headers": "content-type",
+        })
+        response = await client.post(f"{url}/api/chat", json={"message": "hi", "role": "student"},
+                                     headers={"Origin": "http://localhost:5173"})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def ws_session(url, messages, latencies):
+    import websockets
+
+    async with websockets.connect(url.replace("http", "ws", 1) + "/ws/chat") as socket:
+        for i in range(messages):
+            start = time.perf_counter()
+            await socket.send(json.dumps({"type": "chat", "id": i, "message": "hi", "role": "student"}))
+            while True:
+                frame = json.loads(await socket.recv())
+                if frame.get("id") == i and frame["type"] in ("final", "error"):
+                    break
+            latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def run_transport(args, mode):
+    import httpx
+
+    latencies = []
+    cpu_before = server_cpu_seconds(args.server_pid)
+    start = time.perf_counter()
+    if mode == "rest":
+        limits = httpx.Limits(max_connections=args.sessions)
+        async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+            # One client per session would be closer to browsers but needs twice the sockets
+            await asyncio.gather(*(rest_session(client, args.url, args.messages, latencies)
+                                   for _ in range(args.sessions)))
+    else:
+        await asyncio.gather(*(ws_session(args.url, args.messages, latencies) for _ in range(args.sessions)))
+    wall = time.perf_counter() - start
+    cpu_after = server_cpu_seconds(args.server_pid)
+
+    cpu = ""
+    if cpu_before is not None:
+        cpu = f" server_cpu={(cpu_after - cpu_before) / len(latencies) * 1_000_000:.0f}µs/msg"
+    print(f"   {mode:5s} msgs={len(latencies)} p50={percentile(latencies, 50):.1f}ms "
+          f"p95={percentile(latencies, 95):.1f}ms p99={percentile(latencies, 99):.1f}ms "
+          f"throughput={len(latencies) / wall:.0f} msg/s{cpu}")
+
+
+def bench_transport(args):
+    # Start the server without API keys so every answer is local and only transport cost is measured
+    print(f"🔌 {args.sessions} concurrent sessions x {args.messages} messages against {args.url}")
+    for mode in ("rest", "ws"):
+        asyncio.run(run_transport(args, mode))
+
+
+# Misses that motivated the fuzzy index, plus close variants; each must hit one of its intents
+MUST_MATCH = {
+    "exam eligiblity": {"exam eligibility"},
+    "exam eligibilty": {"exam eligibility"},
+    "how r u": {"how are you", "how are u"},
+    "payemnt failed": {"payment failed"},
+    "how to pay fess": {"how to pay fees"},
+}
+
+# Ordinary words and phrases one or two edits from an intent key; none should be answered locally
+NEAR_MISSES = [
+    "debut", "your game", "text", "best", "buy", "they", "hell", "hay", "tests", "thinks",
+    "your fame", "who are they", "did you see", "love your", "how are things", "how to pay rent",
+]
+
+
+def add_typo(text, rng):
+    """One random swap, deletion, substitution or insertion inside a word"""
+    positions = [i for i in range(len(text) - 1) if text[i].isalpha() and text[i + 1].isalpha()]
+    if not positions:
+        return text
+    i = rng.choice(positions)
+    kind = rng.choice(("swap", "delete", "substitute", "insert"))
+    letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    if kind == "swap":
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    if kind == "delete":
+        return text[:i] + text[i + 1:]
+    if kind == "substitute":
+        return text[:i] + letter + text[i + 1:]
+    return text[:i] + letter + text[i:]
+
+
+def bench_fuzzy(args):
+    # Imported here because gemini_ai probes the remote APIs on import
+    from gemini_ai import EXACT_ONLY_INTENTS, LOCAL_RESPONSES
+
+    rng = random.Random(7)
+    real_keys = list(LOCAL_RESPONSES)
+    vocabulary = sorted({word for text in KNOWLEDGE_BASE.values() for word in text.lower().split() if word.isalpha()})
+    synthetic = set()
+    while len(synthetic) < max(0, args.intents - len(real_keys)):
+        synthetic.add(" ".join(rng.sample(vocabulary, rng.randint(2, 4))))
+
+    start = time.perf_counter()
+    index = FuzzyIntentIndex(real_keys + sorted(synthetic), exact_only=EXACT_ONLY_INTENTS)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"🔤 Indexed {len(index.keys)} intents in {build_ms:.0f}ms")
+
+    # (query, intended key) pairs; recorded queries have no known intent
+    queries = [(add_typo(key, rng), key) for key in real_keys for _ in range(3)]
+    queries += [(f"my {add_typo(key, rng)} please", key) for key in real_keys if len(key) > 8]
+    queries += [(query, None) for query in load_queries(args.queries)]
+
+    def legacy_hit(message):
+        message = message.lower()
+        return message in LOCAL_RESPONSES or any(key in message for key in LOCAL_RESPONSES)
+
+    timings, legacy, fuzzy, added, wrong = [], 0, 0, 0, 0
+    for query, intended in queries:
+        start = time.perf_counter()
+        hit = index.match(query, min_coverage=0.6)
+        timings.append((time.perf_counter() - start) * 1000)
+        old = legacy_hit(query)
+        legacy += old
+        fuzzy += bool(hit)
+        added += bool(hit) and not old
+        # 'how are u' and 'how are you' are the same intent once shorthand is expanded
+        wrong += bool(hit and intended and normalize(hit[0]) != normalize(intended))
+
+    print(f"⏱️  Lookup latency over {len(queries)} queries: p50={percentile(timings, 50):.3f}ms "
+          f"p95={percentile(timings, 95):.3f}ms p99={percentile(timings, 99):.3f}ms max={max(timings):.3f}ms")
+    print(f"🎯 Local hit rate: exact/substring {legacy / len(queries) * 100:.1f}% | "
+          f"fuzzy index {fuzzy / len(queries) * 100:.1f}% | "
+          f"added by fuzzy (legacy missed) {added / len(queries) * 100:.1f}%")
+    print(f"⚠️  Typo queries matched to a different intent than intended: {wrong}")
+    false_hits = [(query, hit[0]) for query in NEAR_MISSES if (hit := index.match(query, min_coverage=0.6))]
+    print(f"⚠️  Near-miss words answered locally: {len(false_hits)}/{len(NEAR_MISSES)} "
+          + " ".join(f"{query!r}->{key!r}" for query, key in false_hits))
+
+    # Regression check: fail the run if any of the named misses is no longer answered locally
+    missed = {query: hit for query, expected in MUST_MATCH.items()
+              if (hit := index.match(query, min_coverage=0.6)) is None or hit[0] not in expected}
+    if missed:
+        raise SystemExit(f"❌ Expected local intent hits missed: {missed}")
+    print(f"✅ All {len(MUST_MATCH)} required typo queries matched their intent")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI service benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    retrieval = commands.add_parser("retrieval", help="BM25 retrieval latency and prompt token usage")
+    retrieval.add_argument("--queries", help="query file (plain lines or JSONL with 'message')")
+    retrieval.add_argument("--top-k", type=int, default=3)
+    retrieval.add_argument("--iterations", type=int, default=200)
+    retrieval.add_argument("--live", action="store_true", help="also call the configured provider")
+    retrieval.set_defaults(func=bench_retrieval)
+
+    routing = commands.add_parser("routing", help="offline latency vs answer length per query class")
+    routing.add_argument("--recorded", required=True, help="JSONL with message, latency_ms, completion_tokens")
+    routing.add_argument("--record", action="store_true", help="first record --queries live into --recorded")
+    routing.add_argument("--queries", help="query file used with --record")
+    routing.add_argument("--live", action="store_true", help="also replay the recording live with the planned settings")
+    routing.set_defaults(func=bench_routing)
+
+    transport = commands.add_parser("transport", help="REST vs WebSocket per-message latency and server CPU")
+    transport.add_argument("--url", default="http://localhost:8000")
+    transport.add_argument("--sessions", type=int, default=1000)
+    transport.add_argument("--messages", type=int, default=10, help="messages per session")
+    transport.add_argument("--server-pid", type=int, help="server process to sample CPU time from /proc")
+    transport.set_defaults(func=bench_transport)
+
+    fuzzy = commands.add_parser("fuzzy", help="typo-tolerant intent lookup latency and local hit rate")
+    fuzzy.add_argument("--intents", type=int, default=10000, help="index size, padded with synthetic intents")
+    fuzzy.add_argument("--queries", help="extra query file (plain lines or JSONL with 'message')")
+    fuzzy.set_defaults(func=bench_fuzzy)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
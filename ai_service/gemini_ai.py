@@ -1,10 +1,65 @@
 import requests
+import json
 import os
 import random
+import time
 from dotenv import load_dotenv
+from intent_matcher import FuzzyIntentIndex
+from knowledge_base import KNOWLEDGE_BASE, build_system_prompt
+from query_router import MODEL_TIERS, classify_query, plan_query
+from response_cache import response_cache
+from slo import slo_controller
 
 load_dotenv()
 
+# Overridable so replay runs can point the service at a local stub upstream
+GROQ_URL = os.getenv('GROQ_BASE_URL', 'https://api.groq.com/openai/v1') + '/chat/completions'
+OPENAI_URL = os.getenv('OPENAI_BASE_URL', 'https://api.openai.com/v1') + '/chat/completions'
+COHERE_URL = os.getenv('COHERE_BASE_URL', 'https://api.cohere.ai/v1') + '/chat'
+
+# Small talk and debug answers keyed by intent; {name} is filled in per user
+SMALL_TALK = {
+    'hi': "Hey {name}! 👋 What's up? How can I help you today?",
+    'hello': "Hello {name}! 😊 Good to see you! What's on your mind?",
+    'hey': "Hey there {name}! 🎉 How's it going?",
+    'how are you': "I'm doing great, {name}! 😄 Thanks for asking! How about you?",
+    'how are u': "I'm awesome, {name}! 🌟 How are you doing today?",
+    'i love you': "Aww, that's sweet {name}! 😊 I'm here to help you with anything!",
+    'love you': "Thanks {name}! 😄 You're awesome too!",
+    'fuck you': "I'm here to help you, {name}. 😊 What can I assist you with today?",
+    'which ai api u are': "I'm Vignan AI Assistant! 🤖 Using the latest AI models to help you!",
+    'what api you use': "I use multiple AI services including Groq and OpenAI! 🚀",
+    'have you eat': "I don't eat food, {name}! 😄 But I'm always here and ready to help you!",
+    'did you eat': "I don't need to eat, {name}! 😊 But I'm always here for you!",
+    'your name': "I'm Vignan AI Assistant! 🤖 Your friendly helper!",
+    'who are you': "I'm Vignan AI! 🌟 Created to help students and staff with university matters!",
+    'thank you': "You're welcome, {name}! 😊 Always happy to help!",
+    'thanks': "Anytime, {name}! 😄 What else can I help with?",
+    'bye': "Goodbye {name}! 👋 Take care and see you soon!",
+    'goodbye': "See you later, {name}! 🌟 Have a great day!",
+    'debug': "🔍 I'm using updated AI models to ensure everything works perfectly!",
+    'test': "🧪 Everything is working! I can answer your questions now!",
+}
+
+# Canned FAQ answers; long enough that a typo is still clearly the same question
+FAQ_RESPONSES = {
+    'what is this website': "🌐 This is Vignan University's Online Fee Payment System! Pay fees, get receipts, and more!",
+    'how to pay fees': "💰 To pay fees: Login → Fee Payment → Select type → Pay → Get receipt! Easy, {name}!",
+    'exam eligibility': "🎓 Need 50% fees paid + valid ID + no dues + good attendance!",
+}
+
+LOCAL_RESPONSES = {**SMALL_TALK, **FAQ_RESPONSES, **KNOWLEDGE_BASE}
+
+# One edit turns these short phrases into other real ones ('your game' -> 'your name',
+# 'love your' -> 'love you'), so they only match exactly (after shorthand expansion)
+EXACT_ONLY_INTENTS = {
+    'hi', 'hello', 'hey', 'bye', 'test', 'debug', 'thanks', 'your name', 'love you',
+    'i love you', 'fuck you', 'have you eat', 'did you eat',
+}
+
+# Typo-tolerant lookup over every intent key, built once
+intent_index = FuzzyIntentIndex(LOCAL_RESPONSES, exact_only=EXACT_ONLY_INTENTS)
+
 class WorkingAI:
     def __init__(self):
         self.groq_key = os.getenv('GROQ_API_KEY')
@@ -22,97 +77,6 @@ class WorkingAI:
         else:
             print("✅ Using Smart Local AI (No API limits)")
             
-    def smart_local_response(self, user_message, user_role, user_data):
-        """Smart responses that actually answer questions"""
-        name = user_data.get('name', 'friend') if user_data else 'friend'
-        message = user_message.lower()
-    
-    # Direct answers for common questions
-        responses = {
-        # ... your existing responses ...
-        
-        # === VIGNAN UNIVERSITY INFORMATION ===
-         'vignan university': "🏫 **Vignan University** is a premier educational institution in Andhra Pradesh, India. Known for excellence in engineering, management, and sciences education with state-of-the-art infrastructure and experienced faculty.",
-        
-         'about vignan': "🎓 **Vignan University** offers UG, PG, and PhD programs across various disciplines including Engineering, Management, Pharmacy, and Sciences. The campus features modern labs, libraries, hostels, and sports facilities.",
-        
-         'vignan location': "📍 **Vignan University** is located in Vadlamudi, Guntur District, Andhra Pradesh, India. The campus spans over 100 acres with beautiful infrastructure.",
-        
-         'vignan courses': "📚 **Vignan University Courses**: B.Tech, M.Tech, MBA, BBA, B.Com, B.Pharmacy, M.Pharmacy, Law, and various PhD programs in multiple specializations.",
-        
-         'vignan departments': "🏛️ **Departments**: CSE, ECE, MECH, EEE, AIML, IT, CIVIL, CHEMICAL, MBA, LAW, BBA, BCOM, PHARMACY, and many more.",
-        
-        # === FEE PAYMENT WEBSITE INFORMATION ===
-         'website features': "🌐 **Website Features**:\n• Online fee payments 24/7\n• Digital receipt generation\n• Payment history tracking\n• Admin dashboard\n• Student management\n• Real-time payment status\n• Secure payment gateway",
-        
-         'payment methods': "💳 **Accepted Payment Methods**:\n• UPI (Google Pay, PhonePe, etc.)\n• Credit/Debit Cards\n• Net Banking\n• Mobile Wallets\n• All major Indian payment options",
-        
-         'fee types': "💰 **Fee Types Available**:\n• Tuition Fee: ₹50,000/year\n• Hostel Fee: ₹30,000/year\n• Bus Fee: ₹10,000/year\n• Supply Fee: ₹1,000/attempt\n• Condonation Fee: ₹500\n• Uniform Fee: ₹1,500\n• ID Card Fee: ₹100\n• CRT Fee: ₹5,000",
-        
-         'installment system': "📅 **Installment Plan**:\n• **First 50%**: Required for exam eligibility (Pay by March 31)\n• **Second 50%**: Complete payment (Pay by September 30)\n• No interest charges\n• Automatic payment reminders",
-        
-         'exam eligibility criteria': "🎓 **Exam Eligibility**:\n• ✅ Minimum 50% fee payment\n• ✅ Valid college ID card\n• ✅ No pending library dues\n• ✅ 75% minimum attendance\n• ✅ Course registration completed",
-        
-         'digital receipts': "📄 **Digital Receipts**:\n• Instant generation after payment\n• Download as PDF anytime\n• Email copies automatically\n• 24/7 access in dashboard\n• Valid for all official purposes",
-        
-         'payment deadlines': "📅 **Academic Year 2024-25**:\n• First Installment: March 31, 2024\n• Second Installment: September 30, 2024\n• Late Fee: ₹500 after deadlines\n• Final Deadline: One week before exams",
-        
-         'contact support': "📞 **Support Contacts**:\n• Finance Office: 040-23456789\n• Email: finance@vignan.ac.in\n• Office: Block A, Ground Floor\n• Hours: 9 AM - 5 PM (Mon-Sat)\n• IT Support: 040-23456790",
-        
-         'how to pay online': "🖥️ **Payment Steps**:\n1. Login to student portal\n2. Go to 'Fee Payment' section\n3. Select fee type and amount\n4. Choose payment method\n5. Complete secure payment\n6. Download digital receipt\n7. Check payment history",
-        
-         'forgot password': "🔐 **Password Recovery**:\n• Click 'Forgot Password' on login page\n• Enter your registered email\n• Check email for reset link\n• Create new password\n• Contact IT support if issues",
-        
-         'payment failed': "❌ **Payment Issues**:\n• Check internet connection\n• Verify card/UPI details\n• Ensure sufficient balance\n• Wait 15 minutes and retry\n• Contact bank if needed\n• Payment will be refunded if failed",
-        
-         'receipt download': "📥 **Download Receipt**:\n1. Go to 'Payment History'\n2. Find your transaction\n3. Click 'Download Receipt'\n4. Save PDF file\n5. Print if needed\n• Available 24/7",
-        
-         'admin features': "👨‍💼 **Admin Dashboard**:\n• View all student payments\n• Generate payment reports\n• Export data to Excel\n• Monitor collections\n• Track pending fees\n• Department-wise analytics",
-        
-         'student registration': "👤 **New Student Setup**:\n• Visit college admin office\n• Complete registration form\n• Get student credentials\n• Login to payment portal\n• Update profile information",
-        
-         'hostel facilities': "🏠 **Hostel Information**:\n• AC and non-AC rooms available\n• Food mess with quality meals\n• 24/7 security and WiFi\n• Recreation facilities\n• Laundry services\n• Medical facilities",
-        
-         'bus routes': "🚌 **Transport Facilities**:\n• College buses on multiple routes\n• Pickup/drop points across city\n• Fixed timings and schedules\n• Safe and comfortable travel\n• Annual bus pass available",
-        
-         'library dues': "📚 **Library Clearance**:\n• Return all borrowed books\n• Clear any pending fines\n• Get clearance certificate\n• Required for exam eligibility\n• Contact library for details",
-        
-         'technical support': "🛠️ **Technical Issues**:\n• Clear browser cache\n• Try different browser\n• Check internet connection\n• Contact IT: 040-23456790\n• Email: it-support@vignan.ac.in",
-        
-         'refund policy': "💸 **Refund Policy**:\n• Fees once paid are generally non-refundable\n• Special cases reviewed by committee\n• Contact finance office for queries\n• Documentation required for review",
-        
-         'academic calendar': "📅 **Academic Schedule**:\n• Semester begins: July/August\n• Mid exams: October/November\n• Semester exams: December/January\n• Results: Within 45 days\n• Next semester: January/February",
-        
-         'campus facilities': "🏛️ **Campus Features**:\n• Modern classrooms and labs\n• Central library with digital resources\n• Sports complex and gym\n• Cafeteria and food courts\n• Medical center\n• Bank and ATM facilities",
-        
-         'placement cell': "💼 **Placement Information**:\n• Dedicated placement cell\n• Top company recruitments\n• Training and workshops\n• Internship opportunities\n• Career guidance\n• Contact placement office",
-        
-         'scholarship': "🎯 **Scholarship Options**:\n• Merit-based scholarships\n• Government schemes\n• Fee concession for eligible\n• Contact admin office\n• Submit required documents",
-        
-         'attendance requirement': "📊 **Attendance Policy**:\n• Minimum 75% required\n• Medical leaves considered\n• Parent notification needed\n• Affects exam eligibility\n• Regular attendance important",
-        
-         # ... your existing responses continue ...
-       }
-    
-    # Exact match
-        for key, response in responses.items():
-          if message == key:
-            return response
-    
-    # Partial match
-        for key, response in responses.items():
-          if key in message:
-            return response
-    
-    # Default intelligent response
-        default_responses = [
-        f"Hey {name}! 😊 I understand you're asking about '{user_message}'. That's interesting! How can I help you with that?",
-        f"Hi {name}! 🌟 Thanks for your question! I'd love to help you with '{user_message}'. What specific information are you looking for?",
-        f"Hello {name}! 🚀 I see you're curious about '{user_message}'. Tell me more about what you need help with! 😊"
-        ]
-    
-        return random.choice(default_responses)        
-    
     def test_apis(self):
         """Test APIs with updated models"""
         # Updated model names
@@ -125,6 +89,8 @@ class WorkingAI:
             for model in groq_models:
                 if self.test_groq(model):
                     self.groq_model = model
+                    large = MODEL_TIERS['groq']['large']
+                    self.groq_large_model = large if self.test_groq(large) else model
                     return "groq"
         
         # Test OpenAI
@@ -132,6 +98,8 @@ class WorkingAI:
             for model in openai_models:
                 if self.test_openai(model):
                     self.openai_model = model
+                    large = MODEL_TIERS['openai']['large']
+                    self.openai_large_model = large if self.test_openai(large) else model
                     return "openai"
         
         # Test Cohere with updated models
@@ -145,7 +113,7 @@ class WorkingAI:
     
     def test_groq(self, model):
         try:
-            url = "https://api.groq.com/openai/v1/chat/completions"
+            url = GROQ_URL
             headers = {"Authorization": f"Bearer {self.groq_key}"}
             payload = {
                 "messages": [{"role": "user", "content": "Say hello"}],
@@ -159,7 +127,7 @@ class WorkingAI:
     
     def test_openai(self, model):
         try:
-            url = "https://api.openai.com/v1/chat/completions"
+            url = OPENAI_URL
             headers = {"Authorization": f"Bearer {self.openai_key}"}
             payload = {
                 "messages": [{"role": "user", "content": "Say hello"}],
@@ -173,7 +141,7 @@ class WorkingAI:
     
     def test_cohere(self, model):
         try:
-            url = "https://api.cohere.ai/v1/chat"
+            url = COHERE_URL
             headers = {"Authorization": f"Bearer {self.cohere_key}"}
             payload = {
                 "message": "Say hello",
@@ -187,32 +155,32 @@ class WorkingAI:
     def query_groq(self, user_message, user_role, user_data):
         """Use Groq API with updated model"""
         try:
-            url = "https://api.groq.com/openai/v1/chat/completions"
+            url = GROQ_URL
             headers = {
                 "Authorization": f"Bearer {self.groq_key}",
                 "Content-Type": "application/json"
             }
             
             name = user_data.get('name', 'friend') if user_data else 'friend'
+            plan = plan_query(user_message)
             
             payload = {
                 "messages": [
                     {
                         "role": "system",
-                        "content": f"""You are Vignan AI Assistant. Be conversational and helpful.
-User: {name}. Answer naturally and use emojis occasionally."""
+                        "content": build_system_prompt(user_message, name, style=plan['style'])
                     },
                     {
                         "role": "user",
                         "content": user_message
                     }
                 ],
-                "model": self.groq_model,
-                "temperature": 0.7,
-                "max_tokens": 500
+                "model": self.groq_large_model if plan['tier'] == 'large' else self.groq_model,
+                "temperature": plan['temperature'],
+                "max_tokens": plan['max_tokens']
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = requests.post(url, headers=headers, json=payload, timeout=slo_controller.timeout_for(plan['query_class']))
             if response.status_code == 200:
                 data = response.json()
                 return data['choices'][0]['message']['content']
@@ -223,31 +191,32 @@ User: {name}. Answer naturally and use emojis occasionally."""
     def query_openai(self, user_message, user_role, user_data):
         """Use OpenAI API"""
         try:
-            url = "https://api.openai.com/v1/chat/completions"
+            url = OPENAI_URL
             headers = {
                 "Authorization": f"Bearer {self.openai_key}",
                 "Content-Type": "application/json"
             }
             
             name = user_data.get('name', 'friend') if user_data else 'friend'
+            plan = plan_query(user_message)
             
             payload = {
                 "messages": [
                     {
                         "role": "system",
-                        "content": f"You are a helpful AI assistant. User: {name}. Be conversational."
+                        "content": build_system_prompt(user_message, name, style=plan['style'])
                     },
                     {
                         "role": "user",
                         "content": user_message
                     }
                 ],
-                "model": self.openai_model,
-                "temperature": 0.7,
-                "max_tokens": 500
+                "model": self.openai_large_model if plan['tier'] == 'large' else self.openai_model,
+                "temperature": plan['temperature'],
+                "max_tokens": plan['max_tokens']
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = requests.post(url, headers=headers, json=payload, timeout=slo_controller.timeout_for(plan['query_class']))
             if response.status_code == 200:
                 data = response.json()
                 return data['choices'][0]['message']['content']
@@ -255,16 +224,65 @@ User: {name}. Answer naturally and use emojis occasionally."""
             pass
         return None
     
+    def stream_chat(self, user_message, user_role, user_data):
+        """Stream a Groq/OpenAI answer as it is generated (OpenAI-compatible server-sent events)"""
+        if self.active_api == "groq":
+            url = GROQ_URL
+            key, model, large_model = self.groq_key, self.groq_model, self.groq_large_model
+        else:
+            url = OPENAI_URL
+            key, model, large_model = self.openai_key, self.openai_model, self.openai_large_model
+        headers = {
+            "Authorization": f"Bearer {key}",
+            "Content-Type": "application/json"
+        }
+        
+        name = user_data.get('name', 'friend') if user_data else 'friend'
+        plan = plan_query(user_message)
+        
+        payload = {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": build_system_prompt(user_message, name, style=plan['style'])
+                },
+                {
+                    "role": "user",
+                    "content": user_message
+                }
+            ],
+            "model": large_model if plan['tier'] == 'large' else model,
+            "temperature": plan['temperature'],
+            "max_tokens": plan['max_tokens'],
+            "stream": True
+        }
+        
+        with requests.post(url, headers=headers, json=payload, timeout=slo_controller.timeout_for(plan['query_class']), stream=True) as response:
+            if response.status_code != 200:
+                return
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data: "):
+                    continue
+                data = line[len("data: "):]
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)['choices'][0]['delta'].get('content')
+                if delta:
+                    yield delta
+            else:
+                raise ConnectionError("upstream stream ended before [DONE]")
+    
     def query_cohere(self, user_message, user_role, user_data):
         """Use Cohere API with updated model"""
         try:
-            url = "https://api.cohere.ai/v1/chat"
+            url = COHERE_URL
             headers = {
                 "Authorization": f"Bearer {self.cohere_key}",
                 "Content-Type": "application/json"
             }
             
             name = user_data.get('name', 'friend') if user_data else 'friend'
+            plan = plan_query(user_message)
             
             payload = {
                 "message": user_message,
@@ -272,13 +290,14 @@ User: {name}. Answer naturally and use emojis occasionally."""
                 "chat_history": [
                     {
                         "role": "system",
-                        "message": f"User: {name}. Be helpful and conversational."
+                        "message": build_system_prompt(user_message, name, style=plan['style'])
                     }
                 ],
-                "temperature": 0.7
+                "temperature": plan['temperature'],
+                "max_tokens": plan['max_tokens']
             }
             
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
+            response = requests.post(url, headers=headers, json=payload, timeout=slo_controller.timeout_for(plan['query_class']))
             if response.status_code == 200:
                 data = response.json()
                 return data['text']
@@ -287,67 +306,121 @@ User: {name}. Answer naturally and use emojis occasionally."""
         return None
     
     def generate_response(self, user_message, user_role="student", user_data=None):
-        # Try active API first
-        if self.active_api == "groq":
-            response = self.query_groq(user_message, user_role, user_data)
-            if response:
-                return response
-        
-        elif self.active_api == "openai":
-            response = self.query_openai(user_message, user_role, user_data)
+        return self.respond(user_message, user_role, user_data)[0]
+    
+    def respond(self, user_message, user_role="student", user_data=None):
+        """Answer a message and report how it was routed: 'remote:<api>', 'local:intent', 'cache', 'local', 'local:slo' or 'local:fallback'"""
+        # Order: confident local intent, warm cache, active API (unless the SLO controller
+        # has switched to local-only answers), then smart local responses
+        query = {
+            "groq": self.query_groq,
+            "openai": self.query_openai,
+            "cohere": self.query_cohere,
+        }.get(self.active_api)
+        
+        # Confident intent hits (typos included) never need the upstream
+        key = self.local_intent(user_message)
+        if key:
+            name = (user_data or {}).get('name') or 'friend'
+            return LOCAL_RESPONSES[key].replace('{name}', name), "local:intent"
+        
+        # Precomputed answers for frequent queries, also served in degraded mode
+        cached = response_cache.get(user_message, user_role)
+        if cached:
+            return cached, "cache"
+        
+        ticket = slo_controller.allow_remote() if query else None
+        
+        if ticket:
+            start = time.perf_counter()
+            response = query(user_message, user_role, user_data)
+            slo_controller.upstream_finished(ticket, (time.perf_counter() - start) * 1000, bool(response),
+                                             classify_query(user_message))
             if response:
-                return response
+                return response, f"remote:{self.active_api}"
         
-        elif self.active_api == "cohere":
-            response = self.query_cohere(user_message, user_role, user_data)
-            if response:
-                return response
+        if not query:
+            route = "local"
+        elif ticket:
+            route = "local:fallback"
+        else:
+            route = "local:slo"
         
         # Smart local responses as fallback
-        return self.smart_local_response(user_message, user_role, user_data)
+        return self.smart_local_response(user_message, user_role, user_data), route
     
+    def stream_response(self, user_message, user_role="student", user_data=None, meta=None):
+        """Like generate_response, but yields the answer in pieces as Groq/OpenAI produce it.
+
+        meta, if given, gets meta['route'] with the same values respond() reports.
+        Raises ConnectionError when the upstream stream breaks after some pieces were yielded.
+        """
+        meta = {} if meta is None else meta
+        if self.active_api not in ("groq", "openai") or self.local_intent(user_message):
+            response, meta['route'] = self.respond(user_message, user_role, user_data)
+            yield response
+            return
+        
+        cached = response_cache.get(user_message, user_role)
+        if cached:
+            meta['route'] = "cache"
+            yield cached
+            return
+        
+        ticket = slo_controller.allow_remote()
+        if ticket:
+            start = time.perf_counter()
+            produced = failed = False
+            try:
+                for delta in self.stream_chat(user_message, user_role, user_data):
+                    produced = True
+                    yield delta
+            except Exception:
+                failed = True
+            finally:
+                # A client that stops reading early is not an upstream failure
+                slo_controller.upstream_finished(ticket, (time.perf_counter() - start) * 1000, produced and not failed,
+                                                 classify_query(user_message))
+            meta['route'] = f"remote:{self.active_api}"
+            if produced and failed:
+                # Part of the answer is already out; signal the caller instead of passing it off as complete
+                raise ConnectionError("upstream stream interrupted")
+            if produced:
+                return
+        
+        # Smart local responses as fallback
+        meta['route'] = "local:fallback" if ticket else "local:slo"
+        yield self.smart_local_response(user_message, user_role, user_data)
     
-    def smart_local_response(self, user_message, user_role, user_data):
-        """Smart responses that actually answer questions"""
-        name = user_data.get('name', 'friend') if user_data else 'friend'
+    def match_intent(self, user_message):
+        """Intent key for a message: exact, then substring, then typo-tolerant match"""
         message = user_message.lower()
         
-        # Direct answers for common questions
-        responses = {
-            'hi': f"Hey {name}! 👋 What's up? How can I help you today?",
-            'hello': f"Hello {name}! 😊 Good to see you! What's on your mind?",
-            'hey': f"Hey there {name}! 🎉 How's it going?",
-            'how are you': f"I'm doing great, {name}! 😄 Thanks for asking! How about you?",
-            'how are u': f"I'm awesome, {name}! 🌟 How are you doing today?",
-            'i love you': f"Aww, that's sweet {name}! 😊 I'm here to help you with anything!",
-            'love you': f"Thanks {name}! 😄 You're awesome too!",
-            'fuck you': f"I'm here to help you, {name}. 😊 What can I assist you with today?",
-            'which ai api u are': "I'm Vignan AI Assistant! 🤖 Using the latest AI models to help you!",
-            'what api you use': "I use multiple AI services including Groq and OpenAI! 🚀",
-            'have you eat': f"I don't eat food, {name}! 😄 But I'm always here and ready to help you!",
-            'did you eat': f"I don't need to eat, {name}! 😊 But I'm always here for you!",
-            'your name': "I'm Vignan AI Assistant! 🤖 Your friendly helper!",
-            'who are you': "I'm Vignan AI! 🌟 Created to help students and staff with university matters!",
-            'thank you': f"You're welcome, {name}! 😊 Always happy to help!",
-            'thanks': f"Anytime, {name}! 😄 What else can I help with?",
-            'bye': f"Goodbye {name}! 👋 Take care and see you soon!",
-            'goodbye': f"See you later, {name}! 🌟 Have a great day!",
-            'debug': "🔍 I'm using updated AI models to ensure everything works perfectly!",
-            'test': "🧪 Everything is working! I can answer your questions now!",
-            'what is this website': "🌐 This is Vignan University's Online Fee Payment System! Pay fees, get receipts, and more!",
-            'how to pay fees': f"💰 To pay fees: Login → Fee Payment → Select type → Pay → Get receipt! Easy, {name}!",
-            'exam eligibility': "🎓 Need 50% fees paid + valid ID + no dues + good attendance!",
-        }
-        
         # Exact match
-        for key, response in responses.items():
-            if message == key:
-                return response
+        if message in LOCAL_RESPONSES:
+            return message
         
         # Partial match
-        for key, response in responses.items():
+        for key in LOCAL_RESPONSES:
             if key in message:
-                return response
+                return key
+        
+        # Fuzzy match
+        hit = intent_index.match(message)
+        return hit[0] if hit else None
+    
+    def local_intent(self, user_message):
+        """Intent confidently matching most of the message, answered locally without a remote call"""
+        hit = intent_index.match(user_message, min_coverage=0.6)
+        return hit[0] if hit else None
+    
+    def smart_local_response(self, user_message, user_role, user_data):
+        """Smart responses that actually answer questions"""
+        name = (user_data or {}).get('name') or 'friend'
+        
+        key = self.match_intent(user_message)
+        if key:
+            return LOCAL_RESPONSES[key].replace('{name}', name)
         
         # Default intelligent response
         default_responses = [
@@ -0,0 +1,227 @@
+import math
+import re
+from collections import Counter, defaultdict
+from itertools import chain
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+# Chat shorthand is a whole-word rewrite, not a typo: 'how r u' is 3 edits from 'how are you'
+SHORTHAND = {'u': 'you', 'r': 'are', 'ur': 'your', 'thx': 'thanks', 'pls': 'please', 'plz': 'please'}
+
+
+def normalize(text):
+    return ' '.join(SHORTHAND.get(word, word) for word in WORD_RE.findall(text.lower()))
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_distance(length):
+    """Edits allowed for a key of this length; short keys must match exactly.
+
+    One edit away from a 5-6 letter key is usually another real word ('debut' vs 'debug').
+    """
+    if length <= 6:
+        return 0
+    if length <= 8:
+        return 1
+    if length <= 14:
+        return 2
+    return 3
+
+
+def word_budget(length):
+    """Edits allowed inside one word; the key's own max_distance still caps the phrase total.
+
+    Words under 5 letters must match exactly, or 'your game' would become 'your name'.
+    """
+    if length <= 4:
+        return 0
+    if length <= 8:
+        return 1
+    return 2
+
+
+def bounded_distance(a, b, limit):
+    """Optimal string alignment distance (Levenshtein plus adjacent swaps), or limit + 1 once it exceeds limit.
+
+    Only the diagonal band |i - j| <= limit can stay within the limit, so cells outside it are skipped.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    prev2 = None
+    prev = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        row = [over] * (len(b) + 1)
+        if i <= limit:
+            row[0] = i
+        lo, hi = max(1, i - limit), min(len(b), i + limit)
+        for j in range(lo, hi + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev2[j - 2] + 1)
+            row[j] = value
+        if min(row[max(0, i - limit):hi + 1]) > limit:
+            return over
+        prev2, prev = prev, row
+    return min(prev[-1], over)
+
+
+def deletes(word, depth):
+    """word plus every string reachable by deleting up to depth characters"""
+    found = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        found |= frontier
+    return found
+
+
+class FuzzyIntentIndex:
+    """Typo-tolerant lookup of intent keys inside a message, built once over all keys.
+
+    Short messages are compared whole against keys found through a character-trigram index
+    bucketed by key length. One edit (or adjacent swap) changes at most 4 trigrams, so a key
+    within d edits shares all but 4d of its trigrams. This catches 'how to pay fess' -> 'how to
+    pay fees'; when the word counts agree, no single word may be rewritten ('how to pay rent').
+    Chat shorthand ('how r u') is expanded by normalize before any lookup.
+
+    Keys inside longer messages are found word by word. A SymSpell-style deletion index over
+    the key vocabulary maps each message word to the known words within its edit budget, and
+    keys are then followed from their first word ('my payemnt failed' -> 'payment failed').
+
+    Every candidate is confirmed with a bounded edit distance, and a match needs
+    distance <= max_distance(len(key)).
+    """
+
+    def __init__(self, keys, max_whole_words=4, exact_only=()):
+        """exact_only keys are only matched after normalization, never fuzzily"""
+        self.max_whole_words = max_whole_words
+        self.keys = []
+        self.texts = []
+        self.exact = {}
+        self.allowed = []
+        self.gram_counts = []
+        self.key_words = []
+        self.by_length = defaultdict(lambda: defaultdict(list))  # trigram -> key length -> key ids
+        self.first_word = defaultdict(list)  # first word -> key ids
+        self.word_deletes = defaultdict(set)  # deletion variant -> vocabulary words
+
+        for key in keys:
+            text = normalize(key)
+            if not text or text in self.exact:
+                continue
+            key_id = len(self.keys)
+            self.exact[text] = key_id
+            self.keys.append(key)
+            self.texts.append(text)
+            self.allowed.append(max_distance(len(text)))
+            words = tuple(text.split())
+            self.key_words.append(words)
+            self.gram_counts.append(0)
+            if key in exact_only:
+                continue
+            grams = trigrams(text)
+            self.gram_counts[key_id] = len(grams)
+            for gram in grams:
+                self.by_length[gram][len(text)].append(key_id)
+            self.first_word[words[0]].append(key_id)
+            for word in words:
+                for variant in deletes(word, word_budget(len(word))):
+                    self.word_deletes[variant].add(word)
+
+    def _whole(self, text):
+        """Best (distance, key_id) for the whole normalized message, or None"""
+        # A key of length L can only match within max_distance(L) characters of L
+        lengths = [length for length in range(len(text) - 3, len(text) + 4)
+                   if abs(length - len(text)) <= max_distance(length)]
+        grams = trigrams(text)
+        lists = []
+        for gram in grams:
+            buckets = self.by_length.get(gram)
+            if buckets:
+                lists.extend(buckets[length] for length in lengths if length in buckets)
+        shared = Counter(chain.from_iterable(lists))
+
+        best = None
+        for candidate, count in shared.items():
+            limit = self.allowed[candidate]
+            if count < self.gram_counts[candidate] - 4 * limit or count < len(grams) - 4 * limit:
+                continue
+            distance = bounded_distance(text, self.texts[candidate], limit)
+            if distance <= limit and (best is None or distance < best[0]) and self._words_close(text, candidate):
+                best = (distance, candidate)
+        return best
+
+    def _words_close(self, text, key_id):
+        """False when the edits replace a whole word rather than misspell it"""
+        words, key_words = text.split(), self.key_words[key_id]
+        if len(words) != len(key_words):
+            return True  # split or merged words; the character distance already bounds it
+        for word, key_word in zip(words, key_words):
+            cap = max(1, word_budget(len(key_word))) if len(key_word) >= 3 else 0
+            if bounded_distance(word, key_word, cap) > cap:
+                return False
+        return True
+
+    def _similar_words(self, word):
+        """Known key words within edit budget of a message word, mapped to their distance"""
+        similar = {}
+        for variant in deletes(word, word_budget(len(word) + 2)):
+            for known in self.word_deletes.get(variant, ()):
+                if known not in similar:
+                    limit = word_budget(len(known))
+                    distance = bounded_distance(word, known, limit)
+                    if distance <= limit:
+                        similar[known] = distance
+        return similar
+
+    def _phrase(self, words, min_words):
+        """Best (distance, key_id) for a key spelled out, word by word, inside the message"""
+        similar = [self._similar_words(word) for word in words]
+        best = None
+        for start, options in enumerate(similar):
+            for first, distance in options.items():
+                for key_id in self.first_word.get(first, ()):
+                    key_words = self.key_words[key_id]
+                    if len(key_words) < min_words or start + len(key_words) > len(words):
+                        continue
+                    total = distance
+                    for offset in range(1, len(key_words)):
+                        step = similar[start + offset].get(key_words[offset])
+                        if step is None:
+                            break
+                        total += step
+                    else:
+                        # Ties go to the key covering more of the message
+                        if total <= self.allowed[key_id] and (best is None or (total, -len(key_words)) <
+                                                              (best[0], -len(self.key_words[best[1]]))):
+                            best = (total, key_id)
+        return best
+
+    def match(self, message, min_coverage=0.0, max_words=12):
+        """Return (key, distance) for the best intent found in message, or None.
+
+        min_coverage is the share of the message's words the matched key must cover, so a
+        greeting at the start of a long question does not count as the whole intent.
+        """
+        text = normalize(message)
+        if not text:
+            return None
+        words = text.split()
+        if len(words) > max_words:
+            return None
+
+        key_id = self.exact.get(text)
+        if key_id is not None:
+            return self.keys[key_id], 0
+        # Word-level lookup is cheap, so try it before comparing whole short messages
+        hit = self._phrase(words, max(1, math.ceil(min_coverage * len(words))))
+        if not hit and len(words) <= self.max_whole_words:
+            hit = self._whole(text)
+        if hit:
+            return self.keys[hit[1]], hit[0]
+        return None
@@ -0,0 +1,133 @@
+import math
+import re
+import heapq
+from collections import defaultdict
+
+# University facts used to ground remote answers (fees, deadlines, eligibility, contacts)
+KNOWLEDGE_BASE = {
+    'vignan university': "🏫 **Vignan University** is a premier educational institution in Andhra Pradesh, India. Known for excellence in engineering, management, and sciences education with state-of-the-art infrastructure and experienced faculty.",
+    'about vignan': "🎓 **Vignan University** offers UG, PG, and PhD programs across various disciplines including Engineering, Management, Pharmacy, and Sciences. The campus features modern labs, libraries, hostels, and sports facilities.",
+    'vignan location': "📍 **Vignan University** is located in Vadlamudi, Guntur District, Andhra Pradesh, India. The campus spans over 100 acres with beautiful infrastructure.",
+    'vignan courses': "📚 **Vignan University Courses**: B.Tech, M.Tech, MBA, BBA, B.Com, B.Pharmacy, M.Pharmacy, Law, and various PhD programs in multiple specializations.",
+    'vignan departments': "🏛️ **Departments**: CSE, ECE, MECH, EEE, AIML, IT, CIVIL, CHEMICAL, MBA, LAW, BBA, BCOM, PHARMACY, and many more.",
+    'website features': "🌐 **Website Features**:\n• Online fee payments 24/7\n• Digital receipt generation\n• Payment history tracking\n• Admin dashboard\n• Student management\n• Real-time payment status\n• Secure payment gateway",
+    'payment methods': "💳 **Accepted Payment Methods**:\n• UPI (Google Pay, PhonePe, etc.)\n• Credit/Debit Cards\n• Net Banking\n• Mobile Wallets\n• All major Indian payment options",
+    'fee types': "💰 **Fee Types Available**:\n• Tuition Fee: ₹50,000/year\n• Hostel Fee: ₹30,000/year\n• Bus Fee: ₹10,000/year\n• Supply Fee: ₹1,000/attempt\n• Condonation Fee: ₹500\n• Uniform Fee: ₹1,500\n• ID Card Fee: ₹100\n• CRT Fee: ₹5,000",
+    'installment system': "📅 **Installment Plan**:\n• **First 50%**: Required for exam eligibility (Pay by March 31)\n• **Second 50%**: Complete payment (Pay by September 30)\n• No interest charges\n• Automatic payment reminders",
+    'exam eligibility criteria': "🎓 **Exam Eligibility**:\n• ✅ Minimum 50% fee payment\n• ✅ Valid college ID card\n• ✅ No pending library dues\n• ✅ 75% minimum attendance\n• ✅ Course registration completed",
+    'digital receipts': "📄 **Digital Receipts**:\n• Instant generation after payment\n• Download as PDF anytime\n• Email copies automatically\n• 24/7 access in dashboard\n• Valid for all official purposes",
+    'payment deadlines': "📅 **Academic Year 2024-25**:\n• First Installment: March 31, 2024\n• Second Installment: September 30, 2024\n• Late Fee: ₹500 after deadlines\n• Final Deadline: One week before exams",
+    'contact support': "📞 **Support Contacts**:\n• Finance Office: 040-23456789\n• Email: finance@vignan.ac.in\n• Office: Block A, Ground Floor\n• Hours: 9 AM - 5 PM (Mon-Sat)\n• IT Support: 040-23456790",
+    'how to pay online': "🖥️ **Payment Steps**:\n1. Login to student portal\n2. Go to 'Fee Payment' section\n3. Select fee type and amount\n4. Choose payment method\n5. Complete secure payment\n6. Download digital receipt\n7. Check payment history",
+    'forgot password': "🔐 **Password Recovery**:\n• Click 'Forgot Password' on login page\n• Enter your registered email\n• Check email for reset link\n• Create new password\n• Contact IT support if issues",
+    'payment failed': "❌ **Payment Issues**:\n• Check internet connection\n• Verify card/UPI details\n• Ensure sufficient balance\n• Wait 15 minutes and retry\n• Contact bank if needed\n• Payment will be refunded if failed",
+    'receipt download': "📥 **Download Receipt**:\n1. Go to 'Payment History'\n2. Find your transaction\n3. Click 'Download Receipt'\n4. Save PDF file\n5. Print if needed\n• Available 24/7",
+    'admin features': "👨‍💼 **Admin Dashboard**:\n• View all student payments\n• Generate payment reports\n• Export data to Excel\n• Monitor collections\n• Track pending fees\n• Department-wise analytics",
+    'student registration': "👤 **New Student Setup**:\n• Visit college admin office\n• Complete registration form\n• Get student credentials\n• Login to payment portal\n• Update profile information",
+    'hostel facilities': "🏠 **Hostel Information**:\n• AC and non-AC rooms available\n• Food mess with quality meals\n• 24/7 security and WiFi\n• Recreation facilities\n• Laundry services\n• Medical facilities",
+    'bus routes': "🚌 **Transport Facilities**:\n• College buses on multiple routes\n• Pickup/drop points across city\n• Fixed timings and schedules\n• Safe and comfortable travel\n• Annual bus pass available",
+    'library dues': "📚 **Library Clearance**:\n• Return all borrowed books\n• Clear any pending fines\n• Get clearance certificate\n• Required for exam eligibility\n• Contact library for details",
+    'technical support': "🛠️ **Technical Issues**:\n• Clear browser cache\n• Try different browser\n• Check internet connection\n• Contact IT: 040-23456790\n• Email: it-support@vignan.ac.in",
+    'refund policy': "💸 **Refund Policy**:\n• Fees once paid are generally non-refundable\n• Special cases reviewed by committee\n• Contact finance office for queries\n• Documentation required for review",
+    'academic calendar': "📅 **Academic Schedule**:\n• Semester begins: July/August\n• Mid exams: October/November\n• Semester exams: December/January\n• Results: Within 45 days\n• Next semester: January/February",
+    'campus facilities': "🏛️ **Campus Features**:\n• Modern classrooms and labs\n• Central library with digital resources\n• Sports complex and gym\n• Cafeteria and food courts\n• Medical center\n• Bank and ATM facilities",
+    'placement cell': "💼 **Placement Information**:\n• Dedicated placement cell\n• Top company recruitments\n• Training and workshops\n• Internship opportunities\n• Career guidance\n• Contact placement office",
+    'scholarship': "🎯 **Scholarship Options**:\n• Merit-based scholarships\n• Government schemes\n• Fee concession for eligible\n• Contact admin office\n• Submit required documents",
+    'attendance requirement': "📊 **Attendance Policy**:\n• Minimum 75% required\n• Medical leaves considered\n• Parent notification needed\n• Affects exam eligibility\n• Regular attendance important",
+}
+
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'am', 'to', 'of', 'for', 'in', 'on', 'at', 'and', 'or',
+    'i', 'me', 'my', 'you', 'u', 'your', 'we', 'it', 'do', 'does', 'can', 'what', 'how',
+    'when', 'where', 'which', 'who', 'please', 'pls', 'tell', 'about', 'with', 'be', 'if',
+}
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+EMOJI_RE = re.compile("[\U0001F000-\U0001FFFF\u2600-\u27BF\uFE0F\u200D]+")
+
+
+def tokenize(text):
+    """Lowercase word tokens without stopwords, cut to a 6-char prefix as a cheap stemmer"""
+    tokens = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s'):
+            token = token[:-1]
+        tokens.append(token[:6])
+    return tokens
+
+
+def compact_snippet(key, text):
+    """Strip emojis and markdown so a fact costs as few prompt tokens as possible"""
+    lines = [line.strip(" •-*\t") for line in text.replace('**', '').split('\n')]
+    lines = [EMOJI_RE.sub('', line).strip() for line in lines]
+    # Drop heading lines like "Fee Types Available:"; the key already names the topic
+    body = '; '.join(line for line in lines if line and not line.endswith(':'))
+    return f"{key.title()}: {body}"
+
+
+class BM25Index:
+    """Small in-memory BM25 index with an inverted posting list per term"""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.keys = list(documents.keys())
+        self.snippets = [compact_snippet(key, text) for key, text in documents.items()]
+        self.postings = defaultdict(list)
+        self.doc_lengths = []
+
+        for doc_id, key in enumerate(self.keys):
+            # Index the key twice so topic words outweigh incidental words in the body
+            tokens = tokenize(key) * 2 + tokenize(documents[key])
+            self.doc_lengths.append(len(tokens))
+            counts = defaultdict(int)
+            for token in tokens:
+                counts[token] += 1
+            for token, tf in counts.items():
+                self.postings[token].append((doc_id, tf))
+
+        doc_count = len(self.keys)
+        self.avg_length = sum(self.doc_lengths) / doc_count if doc_count else 0.0
+        self.idf = {
+            token: math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+            for token, docs in self.postings.items()
+        }
+
+    def search(self, query, k=3, min_score=1.0):
+        """Return up to k (score, key, snippet) tuples, best first"""
+        scores = defaultdict(float)
+        for token in set(tokenize(query)):
+            idf = self.idf.get(token)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[token]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / self.avg_length)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(score, self.keys[doc_id], self.snippets[doc_id]) for doc_id, score in best if score >= min_score]
+
+
+# Built once at import; the knowledge base is static
+kb_index = BM25Index(KNOWLEDGE_BASE)
+
+
+def build_system_prompt(user_message, name, top_k=3, style="Answer in 2-4 short sentences."):
+    """System prompt grounded with only the top-k knowledge base snippets for this query.
+
+    name=None leaves the user out, for answers shared across users (warm cache).
+    """
+    user = f" User: {name}." if name else ""
+    prompt = f"""You are Vignan AI Assistant.{user}
+{style} Use emojis occasionally."""
+    hits = kb_index.search(user_message, k=top_k)
+    if hits:
+        facts = '\n'.join(f"- {snippet}" for _, _, snippet in hits)
+        prompt += f"""
+Use these Vignan facts. Never invent fees, dates or contacts that are not listed:
+{facts}"""
+    return prompt
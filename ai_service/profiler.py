@@ -0,0 +1,213 @@
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def frame_name(name, filename, lineno):
+    if filename == '~':  # built-ins in cProfile output
+        return name
+    return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+
+class RequestProfiler:
+    """Profiles the next N chat requests or a time window, on demand.
+
+    mode 'sample' polls the stacks of threads serving profiled requests and returns
+    collapsed stacks ("a;b;c count") for flamegraph.pl / speedscope.
+    mode 'cprofile' runs cProfile around each profiled request. cProfile only keeps
+    caller -> callee totals, so its collapsed stacks ("a;b;c microseconds") split each
+    function's time across its callers in proportion; pstats text is also available.
+    When idle the only cost is the `active` check in the chat endpoint.
+    """
+
+    def __init__(self):
+        self.active = False
+        self.lock = threading.Lock()
+        self.cprofile_lock = threading.Lock()
+        self.mode = 'sample'
+        self.remaining = None
+        self.deadline = None
+        self.interval = 0.005
+        self.threads = {}  # thread id -> root label
+        self.stacks = Counter()
+        self.stats = None
+        self.profiled_requests = 0
+        self.sampler = None
+        self.label = 'request'
+
+    def start(self, mode='sample', requests=None, seconds=None, interval_ms=5):
+        if mode not in ('sample', 'cprofile'):
+            raise ValueError("mode must be 'sample' or 'cprofile'")
+        if not requests and not seconds:
+            raise ValueError("give a number of requests, a time window in seconds, or both")
+        with self.lock:
+            self.mode = mode
+            self.remaining = requests
+            self.deadline = time.monotonic() + seconds if seconds else None
+            self.interval = interval_ms / 1000
+            self.stacks = Counter()
+            self.stats = None
+            self.profiled_requests = 0
+            self.active = True
+            if mode == 'sample' and self.sampler is None:
+                self.sampler = threading.Thread(target=self._sample_loop, name="request-profiler", daemon=True)
+                self.sampler.start()
+        print(f"🔬 Profiling started: mode={mode} requests={requests} seconds={seconds}")
+        return self.status()
+
+    def _expired(self):
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return True
+        return self.remaining is not None and self.remaining <= 0 and not self.threads
+
+    def _claim(self):
+        """Reserve a slot for one more profiled request; False once the budget is used up"""
+        with self.lock:
+            if not self.active or self._expired():
+                self.active = False
+                return False
+            if self.remaining is not None:
+                if self.remaining <= 0:
+                    return False
+                self.remaining -= 1
+            self.profiled_requests += 1
+            return True
+
+    def profile_call(self, label, func, *args):
+        """Run func(*args) in the current thread, profiling it if a slot is still available"""
+        if self.mode == 'cprofile':
+            self.label = label
+            return self._cprofile_call(func, *args)
+        if not self._claim():
+            return func(*args)
+
+        thread_id = threading.get_ident()
+        with self.lock:
+            self.threads[thread_id] = label
+        try:
+            return func(*args)
+        finally:
+            with self.lock:
+                del self.threads[thread_id]
+                if self._expired():
+                    self.active = False
+
+    def _cprofile_call(self, func, *args):
+        # Only one cProfile can be active at a time (Python 3.12+ enforces it), so overlapping requests run unprofiled
+        if not self.cprofile_lock.acquire(blocking=False):
+            return func(*args)
+        try:
+            if not self._claim():
+                return func(*args)
+            profile = cProfile.Profile()
+            try:
+                return profile.runcall(func, *args)
+            finally:
+                with self.lock:
+                    if self.stats is None:
+                        self.stats = pstats.Stats(profile)
+                    else:
+                        self.stats.add(profile)
+                    if self._expired():
+                        self.active = False
+        finally:
+            self.cprofile_lock.release()
+
+    def _sample_loop(self):
+        while True:
+            with self.lock:
+                if self._expired():
+                    self.active = False
+                if not self.active:
+                    self.sampler = None
+                    return
+                threads = dict(self.threads)
+            if threads:
+                frames = sys._current_frames()
+                for thread_id, label in threads.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stack = self._collapse(frame, label)
+                        with self.lock:
+                            self.stacks[stack] += 1
+            time.sleep(self.interval)
+
+    def _collapse(self, frame, label):
+        names = []
+        while frame is not None and frame.f_code is not self.profile_call.__code__:
+            code = frame.f_code
+            names.append(frame_name(code.co_name, code.co_filename, code.co_firstlineno))
+            frame = frame.f_back
+        names.append(label)
+        return ';'.join(reversed(names))
+
+    def _cprofile_stacks(self, max_depth=64, min_us=1.0):
+        """Collapsed stacks weighted in microseconds, rebuilt from the cProfile call graph"""
+        stats = self.stats.stats  # func -> (cc, nc, tottime, cumtime, {caller: (cc, nc, tottime, cumtime)})
+        callees = {}
+        for func, (_, _, _, _, callers) in stats.items():
+            for caller, edge in callers.items():
+                callees.setdefault(caller, []).append((func, edge[3]))
+        stacks = Counter()
+        seen = set()  # functions on the current path; recursion is cut off
+
+        def walk(func, path, seconds):
+            # seconds: cumulative time of func along this path
+            cumtime = stats[func][3]
+            share = seconds / cumtime if cumtime else 0.0
+            path = path + (frame_name(func[2], func[0], func[1]),)
+            own = stats[func][2] * share * 1e6
+            if own >= min_us:
+                stacks[';'.join(path)] += own
+            if len(path) > max_depth:
+                return
+            for callee, edge_cumtime in callees.get(func, ()):
+                child = edge_cumtime * share
+                if callee in seen or child * 1e6 < min_us:
+                    continue
+                seen.add(callee)
+                walk(callee, path, child)
+                seen.discard(callee)
+
+        for func, (_, _, _, cumtime, callers) in stats.items():
+            # Entry points: called by nothing profiled except (recursively) themselves
+            if not set(callers) - {func}:
+                seen.clear()
+                seen.add(func)
+                walk(func, (self.label,), cumtime)
+        return stacks
+
+    def collapsed(self):
+        with self.lock:
+            if self.mode == 'cprofile':
+                stacks = self._cprofile_stacks() if self.stats is not None else Counter()
+                return '\n'.join(f"{stack} {round(us)}" for stack, us in stacks.most_common() if round(us))
+            return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def pstats_text(self, limit=60):
+        with self.lock:
+            if self.stats is None:
+                return ''
+            out = io.StringIO()
+            self.stats.stream = out
+            self.stats.sort_stats('cumulative').print_stats(limit)
+            return out.getvalue()
+
+    def status(self):
+        with self.lock:
+            return {
+                'active': self.active and not self._expired(),
+                'mode': self.mode,
+                'remaining_requests': self.remaining,
+                'seconds_left': round(max(0.0, self.deadline - time.monotonic()), 1) if self.deadline else None,
+                'profiled_requests': self.profiled_requests,
+                'samples': sum(self.stacks.values()),
+            }
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,52 @@
+import re
+from knowledge_base import kb_index
+
+# Output budget and model tier per query class; generation time grows with output tokens
+QUERY_CLASSES = {
+    'smalltalk': {'max_tokens': 60, 'temperature': 0.7, 'tier': 'fast', 'p95_ms': 2500,
+                  'style': "Reply in one short, friendly sentence."},
+    'factual': {'max_tokens': 160, 'temperature': 0.3, 'tier': 'fast', 'p95_ms': 4000,
+                'style': "Answer in 2-4 short sentences."},
+    'detailed': {'max_tokens': 400, 'temperature': 0.5, 'tier': 'large', 'p95_ms': 10000,
+                 'style': "Answer clearly in under 200 words."},
+}
+
+# Preferred model per provider and tier; large models are probed at startup and
+# fall back to the fast model when the key has no access
+MODEL_TIERS = {
+    'groq': {'fast': 'llama-3.1-8b-instant', 'large': 'llama-3.3-70b-versatile'},
+    'openai': {'fast': 'gpt-3.5-turbo', 'large': 'gpt-4o'},
+}
+
+SMALLTALK_WORDS = {
+    'hi', 'hii', 'hello', 'hey', 'bye', 'goodbye', 'thanks', 'thank', 'ok', 'okay', 'cool',
+    'good', 'morning', 'night', 'evening', 'how', 'are', 'you', 'u', 'r', 'doing', 'lol',
+    'nice', 'great', 'who', 'your', 'name', 'love', 'sup', 'yo',
+}
+
+DETAIL_MARKERS = re.compile(
+    r"\b(explain|why|policy|process|procedure|steps|compare|difference|detail|detailed|"
+    r"elaborate|describe|everything|step by step|what happens if)\b"
+)
+
+WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def classify_query(user_message):
+    """Return 'smalltalk', 'factual' or 'detailed' using cheap lexical rules"""
+    message = user_message.lower()
+    words = WORD_RE.findall(message)
+
+    if not words or (len(words) <= 6 and all(word in SMALLTALK_WORDS for word in words)):
+        return 'smalltalk'
+    if DETAIL_MARKERS.search(message) or len(words) > 25:
+        return 'detailed'
+    if len(words) <= 3 and not kb_index.search(message, k=1):
+        return 'smalltalk'
+    return 'factual'
+
+
+def plan_query(user_message):
+    """Generation settings for a message: its class plus max_tokens, temperature, tier and style"""
+    query_class = classify_query(user_message)
+    return dict(QUERY_CLASSES[query_class], query_class=query_class)
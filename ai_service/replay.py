@@ -0,0 +1,237 @@
+"""Replay captured chat traffic against a service instance and compare builds.
+
+Usage:
+    # 1. Stub upstream that answers like Groq/OpenAI/Cohere with deterministic latency
+    python replay.py stub --port 9000
+
+    # 2. Service under test, pointed at the stub
+    GROQ_API_KEY=stub GROQ_BASE_URL=http://localhost:9000 python server.py
+
+    # 3. Replay a capture (TRAFFIC_CAPTURE_PATH writes one file per server process) at original or scaled speed
+    python replay.py run capture-*.jsonl.gz --url http://localhost:8000 --speed 2 --out build_a.jsonl.gz
+
+    # 4. Compare latency distributions and local-vs-remote routing
+    python replay.py compare build_a.jsonl.gz build_b.jsonl.gz
+
+Captures hold both /api/chat requests and /ws/chat messages; run replays all of them through
+/api/chat, which answers with the same routing. The run command needs the httpx package.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import random
+import statistics
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench import percentile
+from traffic import read_records
+
+
+class StubUpstream(BaseHTTPRequestHandler):
+    """OpenAI-compatible /chat/completions (plain and streamed) and Cohere-style /chat"""
+
+    base_ms = 300
+    jitter_ms = 100
+    ms_per_token = 5
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.path.endswith("/chat/completions"):
+            message = body["messages"][-1]["content"]
+            max_tokens = body.get("max_tokens", 500)
+        else:
+            message = body.get("message", "")
+            max_tokens = body.get("max_tokens", 500)
+
+        # Same message -> same latency and answer length on every run
+        rng = random.Random(hashlib.sha256(message.encode()).digest())
+        tokens = min(max_tokens, rng.randint(20, 300))
+        delay = (self.base_ms + rng.uniform(0, self.jitter_ms) + self.ms_per_token * tokens) / 1000
+        text = " ".join(["stub"] * tokens)
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            time.sleep(self.base_ms / 1000)
+            for _ in range(tokens):
+                time.sleep(self.ms_per_token / 1000)
+                chunk = {"choices": [{"delta": {"content": "stub "}}]}
+                self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+            self._write_chunk("data: [DONE]\n\n")
+            self._write_chunk("")
+            return
+
+        time.sleep(delay)
+        if self.path.endswith("/chat/completions"):
+            payload = {
+                "choices": [{"message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": len(message) // 4, "completion_tokens": tokens},
+            }
+        else:
+            payload = {"text": text}
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def run_stub(args):
+    StubUpstream.base_ms = args.base_ms
+    StubUpstream.jitter_ms = args.jitter_ms
+    StubUpstream.ms_per_token = args.ms_per_token
+    server = ThreadingHTTPServer(("0.0.0.0", args.port), StubUpstream)
+    print(f"🧪 Stub upstream on http://localhost:{args.port} "
+          f"(base={args.base_ms}ms jitter={args.jitter_ms}ms {args.ms_per_token}ms/token)")
+    server.serve_forever()
+
+
+async def replay(args):
+    import httpx
+
+    records = [record for path in args.capture for record in read_records(path)]
+    records.sort(key=lambda r: r["ts"])
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        raise SystemExit("Capture is empty")
+
+    results = []
+    first_ts = records[0]["ts"]
+    start = time.perf_counter()
+
+    async def send(client, record):
+        # Open loop: keep the captured arrival times, scaled by --speed
+        delay = (record["ts"] - first_ts) / args.speed - (time.perf_counter() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        payload = {
+            "message": record["message"],
+            "role": record.get("role") or "student",
+            "user_data": {"name": "Student"} if record.get("user") else None,
+        }
+        sent = time.perf_counter()
+        try:
+            response = await client.post(f"{args.url}/api/chat", json=payload)
+            status = "ok" if response.status_code == 200 else "error"
+            route = response.headers.get("X-AI-Route", "unknown") if status == "ok" else "error"
+        except httpx.HTTPError:
+            status, route = "error", "error"
+        results.append({
+            "ts": round(first_ts + (sent - start), 3),
+            "message": record["message"],
+            "role": payload["role"],
+            "user": record.get("user"),
+            "latency_ms": round((time.perf_counter() - sent) * 1000, 2),
+            "route": route,
+            "status": status,
+            "captured_latency_ms": record.get("latency_ms"),
+            "captured_route": record.get("route"),
+        })
+
+    limits = httpx.Limits(max_connections=args.max_connections)
+    async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+        await asyncio.gather(*(send(client, record) for record in records))
+
+    wall = time.perf_counter() - start
+    results.sort(key=lambda r: r["ts"])
+    with gzip.open(args.out, "wt", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+    print(f"🔁 Replayed {len(results)} requests in {wall:.1f}s at {args.speed}x → {args.out}")
+    summarize("replay", results)
+
+
+def summarize(label, records):
+    latencies = [r["latency_ms"] for r in records if r.get("status") == "ok"]
+    routes = Counter(r.get("route") for r in records)
+    errors = sum(1 for r in records if r.get("status") == "error")
+    if latencies:
+        print(f"   {label:12s} n={len(records)} mean={statistics.mean(latencies):.1f}ms "
+              f"p50={percentile(latencies, 50):.1f}ms p95={percentile(latencies, 95):.1f}ms "
+              f"p99={percentile(latencies, 99):.1f}ms errors={errors / len(records) * 100:.1f}%")
+    else:
+        print(f"   {label:12s} n={len(records)} no successful requests")
+    return latencies, routes
+
+
+def compare(args):
+    print("📊 Latency")
+    base_records = list(read_records(args.baseline))
+    cand_records = list(read_records(args.candidate))
+    base_lat, base_routes = summarize("baseline", base_records)
+    cand_lat, cand_routes = summarize("candidate", cand_records)
+
+    if base_lat and cand_lat:
+        for pct in (50, 95, 99):
+            before, after = percentile(base_lat, pct), percentile(cand_lat, pct)
+            change = (after - before) / before * 100 if before else 0.0
+            print(f"   p{pct}: {before:.1f}ms → {after:.1f}ms ({change:+.1f}%)")
+
+    print("🧭 Routing (share of requests)")
+    for route in sorted(set(base_routes) | set(cand_routes)):
+        before = base_routes[route] / len(base_records) * 100
+        after = cand_routes[route] / len(cand_records) * 100
+        print(f"   {route:16s} {before:5.1f}% → {after:5.1f}% ({after - before:+.1f} pts)")
+
+    # Same message routed differently between builds
+    base_by_message = {r["message"]: r.get("route") for r in base_records}
+    flips = Counter(
+        (base_by_message[r["message"]], r.get("route"))
+        for r in cand_records
+        if r["message"] in base_by_message and base_by_message[r["message"]] != r.get("route")
+    )
+    for (before, after), count in flips.most_common(10):
+        print(f"   {count:5d} messages moved {before} → {after}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat traffic replay harness")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    stub = commands.add_parser("stub", help="serve a deterministic stub upstream")
+    stub.add_argument("--port", type=int, default=9000)
+    stub.add_argument("--base-ms", type=float, default=300)
+    stub.add_argument("--jitter-ms", type=float, default=100)
+    stub.add_argument("--ms-per-token", type=float, default=5)
+    stub.set_defaults(func=run_stub)
+
+    run = commands.add_parser("run", help="replay a capture against a service instance")
+    run.add_argument("capture", nargs="+", help="capture files, merged by arrival time")
+    run.add_argument("--url", default="http://localhost:8000")
+    run.add_argument("--speed", type=float, default=1.0, help="2 = twice as fast as captured")
+    run.add_argument("--limit", type=int)
+    run.add_argument("--max-connections", type=int, default=500)
+    run.add_argument("--timeout", type=float, default=60)
+    run.add_argument("--out", default="replay.jsonl.gz")
+    run.set_defaults(func=lambda args: asyncio.run(replay(args)))
+
+    diff = commands.add_parser("compare", help="compare two captures or replay results")
+    diff.add_argument("baseline")
+    diff.add_argument("candidate")
+    diff.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    if args.command == "run" and not args.speed > 0:
+        run.error("--speed must be positive")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
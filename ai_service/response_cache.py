@@ -0,0 +1,92 @@
+import gzip
+import json
+import os
+import threading
+import time
+
+from intent_matcher import normalize
+
+# user_data for answers shared across users: no name goes into the system prompt
+ANONYMOUS_USER = {'name': None}
+
+
+class ResponseCache:
+    """Precomputed answers for frequent queries, keyed by role and normalized message.
+
+    Filled from a warm-start snapshot written by warm_cache.py and loaded once at startup
+    (WARM_CACHE_PATH). Lookups are a single dict read, so the cache also serves while the
+    SLO controller keeps new requests off the upstream. Fees and dates change, so a snapshot
+    older than max_age_hours is refused at load and dropped once it expires while serving.
+    """
+
+    def __init__(self, entries=None, meta=None, max_age_hours=168):
+        self.entries = entries or {}
+        self.meta = meta or {}
+        self.expires = self.meta.get('created', time.time()) + max_age_hours * 3600
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path, max_age_hours=168):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        entries = {(entry['role'], entry['key']): entry['response'] for entry in snapshot['entries']}
+        cache = cls(entries, snapshot.get('meta'), max_age_hours)
+        age_hours = (time.time() - cache.meta.get('created', time.time())) / 3600
+        if cache.expired():
+            print(f"⚠️ Warm cache {path} is {age_hours:.1f}h old (limit {max_age_hours}h); not loaded")
+            return cls()
+        print(f"🔥 Loaded {len(entries)} warm answers from {path} ({age_hours:.1f}h old)")
+        return cache
+
+    @classmethod
+    def from_env(cls):
+        path = os.getenv('WARM_CACHE_PATH')
+        if not path:
+            return cls()
+        try:
+            return cls.load(path, max_age_hours=float(os.getenv('WARM_CACHE_MAX_AGE_HOURS', 168)))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Warm cache {path} not loaded: {e}")
+            return cls()
+
+    @staticmethod
+    def save(path, entries, meta):
+        """Write a snapshot: entries is a list of {'role', 'key', 'message', 'response', 'count'}"""
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'entries': entries}, f, ensure_ascii=False)
+
+    def expired(self):
+        return time.time() >= self.expires
+
+    def get(self, message, role="student"):
+        if not self.entries:
+            return None
+        if self.expired():
+            print("⚠️ Warm cache expired; serving without it")
+            self.clear()
+            return None
+        response = self.entries.get((role, normalize(message)))
+        with self.lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def clear(self):
+        self.entries = {}
+
+    def status(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'created': self.meta.get('created'),
+                'hits': self.hits,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+response_cache = ResponseCache.from_env()
@@ -1,10 +1,26 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import iterate_in_threadpool, run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel
 import uvicorn
+import asyncio
+import json
+import os
+import secrets
+import time
 from gemini_ai import gemini_ai
+from profiler import request_profiler
+from response_cache import response_cache
+from slo import BUSY_MESSAGE, slo_controller
+from traffic import traffic_recorder
 from datetime import datetime
 
+WS_IDLE_SECONDS = float(os.getenv('WS_IDLE_SECONDS', 300))
+WS_HEARTBEAT_SECONDS = float(os.getenv('WS_HEARTBEAT_SECONDS', 30))
+WS_MAX_PENDING = int(os.getenv('WS_MAX_PENDING', 8))
+ADMIN_TOKEN = os.getenv('ADMIN_TOKEN')
+
 app = FastAPI(title="Vignan AI Assistant", version="2.0.0")
 
 # CORS middleware
@@ -26,20 +42,204 @@ class ChatResponse(BaseModel):
     response: str
     timestamp: str
 
+class ProfileRequest(BaseModel):
+    mode: str = "sample"
+    requests: int = None
+    seconds: float = None
+    interval_ms: float = 5
+
+def require_admin(token):
+    # Admin endpoints stay disabled unless ADMIN_TOKEN is set
+    if not ADMIN_TOKEN or not token or not secrets.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest):
+async def chat_endpoint(request: ChatRequest, http_response: Response):
+    arrived = time.time()
+    start = time.perf_counter()
+    route, status = "shed", "ok"
+    # Shed excess load before doing any work
+    if not slo_controller.request_started():
+        http_response.headers["X-AI-Route"] = route
+        record_traffic(request.message, request.role, request.user_data, arrived, start, route, status)
+        return ChatResponse(success=True, response=BUSY_MESSAGE, timestamp=datetime.utcnow().isoformat())
     try:
         print(f"🤖 Received query: {request.message} from {request.role}")
-        response = gemini_ai.generate_response(request.message, request.role, request.user_data)
+        # Upstream calls block, so keep them off the event loop
+        if request_profiler.active:
+            response, route = await run_in_threadpool(request_profiler.profile_call, "chat_endpoint", gemini_ai.respond,
+                                                      request.message, request.role, request.user_data)
+        else:
+            response, route = await run_in_threadpool(gemini_ai.respond, request.message, request.role, request.user_data)
         print(f"🤖 AI Response generated successfully")
+        http_response.headers["X-AI-Route"] = route
         return ChatResponse(success=True, response=response, timestamp=datetime.utcnow().isoformat())
     except Exception as e:
         print(f"❌ AI Error: {str(e)}")
+        route, status = "error", "error"
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        slo_controller.request_finished()
+        record_traffic(request.message, request.role, request.user_data, arrived, start, route, status)
+
+def record_traffic(message, role, user_data, arrived, start, route, status):
+    if traffic_recorder:
+        traffic_recorder.record(message, role, user_data, arrived, (time.perf_counter() - start) * 1000, route, status)
+
+@app.on_event("shutdown")
+def close_traffic_recorder():
+    if traffic_recorder:
+        traffic_recorder.close()
+
+@app.post("/api/admin/profile")
+async def start_profile(request: ProfileRequest, x_admin_token: str = Header(None)):
+    """Profile the next `requests` chat requests and/or the next `seconds` of traffic"""
+    require_admin(x_admin_token)
+    try:
+        return request_profiler.start(request.mode, request.requests, request.seconds, request.interval_ms)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/admin/profile", response_class=PlainTextResponse)
+async def profile_results(format: str = "collapsed", x_admin_token: str = Header(None)):
+    """Collapsed stacks from the last profiling run (sample counts, or microseconds in cprofile mode).
+
+    format=pstats returns cProfile's own text report instead (cprofile mode only).
+    """
+    require_admin(x_admin_token)
+    status = request_profiler.status()
+    if format == "pstats":
+        if status["mode"] != "cprofile":
+            raise HTTPException(status_code=400, detail="pstats output needs a cprofile run")
+        body = request_profiler.pstats_text()
+    else:
+        body = request_profiler.collapsed()
+    headers = {"X-Profile-Active": str(status["active"]).lower(), "X-Profiled-Requests": str(status["profiled_requests"])}
+    return PlainTextResponse(body, headers=headers)
+
+@app.websocket("/ws/chat")
+async def chat_socket(websocket: WebSocket):
+    """One connection per chat session.
+
+    Client frames: {"type": "chat", "id": ..., "message": ..., "role": ..., "user_data": ...} and {"type": "ping"}.
+    Server frames: {"type": "partial", "id", "delta"}, {"type": "final", "id", "response", "timestamp"},
+    {"type": "error", "id", "detail"}, {"type": "pong"} and {"type": "heartbeat"} every WS_HEARTBEAT_SECONDS.
+    An error after partial frames means the upstream broke mid-answer; discard that id's partials.
+    Clients should ping every WS_HEARTBEAT_SECONDS; the socket closes when nothing arrives for two heartbeat
+    periods, or after WS_IDLE_SECONDS without a chat message.
+    """
+    await websocket.accept()
+    send_lock = asyncio.Lock()
+    pending = set()
+
+    async def send(frame):
+        async with send_lock:
+            await websocket.send_json(frame)
+
+    async def answer(frame, arrived):
+        msg_id = frame.get("id")
+        message, role, user_data = frame.get("message", ""), frame.get("role", "student"), frame.get("user_data")
+        if not (isinstance(message, str) and isinstance(role, str) and isinstance(user_data, (dict, type(None)))):
+            await send({"type": "error", "id": msg_id, "detail": "message and role must be strings, user_data an object"})
+            return
+        start = time.perf_counter()
+        # Same capture records as /api/chat, one per message id
+        if not slo_controller.request_started():
+            record_traffic(message, role, user_data, arrived, start, "shed", "ok")
+            await send({"type": "final", "id": msg_id, "response": BUSY_MESSAGE, "timestamp": datetime.utcnow().isoformat()})
+            return
+        meta, status = {}, "ok"
+        try:
+            chunks = []
+            stream = gemini_ai.stream_response(message, role, user_data, meta)
+            async for delta in iterate_in_threadpool(stream):
+                chunks.append(delta)
+                await send({"type": "partial", "id": msg_id, "delta": delta})
+            await send({"type": "final", "id": msg_id, "response": "".join(chunks), "timestamp": datetime.utcnow().isoformat()})
+        except WebSocketDisconnect:
+            status = "disconnected"
+        except asyncio.CancelledError:
+            # Session closed while answering
+            status = "cancelled"
+            raise
+        except Exception as e:
+            print(f"❌ AI Error: {str(e)}")
+            meta["route"], status = "error", "error"
+            await send({"type": "error", "id": msg_id, "detail": str(e)})
+        finally:
+            slo_controller.request_finished()
+            record_traffic(message, role, user_data, arrived, start, meta.get("route", "error"), status)
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_SECONDS)
+            try:
+                await send({"type": "heartbeat"})
+            except (WebSocketDisconnect, RuntimeError, OSError):
+                # Socket already closed; the receive loop cleans up the session
+                return
+
+    async def receive_frame():
+        """Next client frame parsed as JSON; text or UTF-8 binary frames, ValueError otherwise"""
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        text = message.get("text")
+        if text is None:
+            if message.get("bytes") is None:
+                raise ValueError("empty frame")
+            text = message["bytes"].decode("utf-8")
+        return json.loads(text)
+
+    heartbeat_task = asyncio.create_task(heartbeat())
+    loop = asyncio.get_running_loop()
+    last_chat = loop.time()
+    try:
+        while True:
+            idle_left = WS_IDLE_SECONDS - (loop.time() - last_chat)
+            if idle_left <= 0:
+                await websocket.close(code=1000, reason="idle timeout")
+                break
+            try:
+                frame = await asyncio.wait_for(receive_frame(), timeout=min(idle_left, 2 * WS_HEARTBEAT_SECONDS))
+            except asyncio.TimeoutError:
+                if loop.time() - last_chat >= WS_IDLE_SECONDS:
+                    continue
+                await websocket.close(code=1001, reason="heartbeat timeout")
+                break
+            except ValueError:
+                # Not JSON (or not UTF-8); reject the frame but keep the session and its pending answers
+                await send({"type": "error", "id": None, "detail": "frames must be JSON objects"})
+                continue
+
+            if not isinstance(frame, dict):
+                await send({"type": "error", "id": None, "detail": "frames must be JSON objects"})
+            elif frame.get("type") == "ping":
+                await send({"type": "pong"})
+            elif frame.get("type") == "chat":
+                last_chat = loop.time()
+                if len(pending) >= WS_MAX_PENDING:
+                    await send({"type": "error", "id": frame.get("id"), "detail": "too many messages in flight"})
+                    continue
+                task = asyncio.create_task(answer(frame, time.time()))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        heartbeat_task.cancel()
+        for task in pending:
+            task.cancel()
 
 @app.get("/api/health")
 async def health_check():
-    return {"status": "healthy", "service": "Vignan Gemini AI Assistant", "timestamp": datetime.utcnow().isoformat()}
+    return {
+        "status": "healthy",
+        "service": "Vignan Gemini AI Assistant",
+        "ai_mode": slo_controller.status(),
+        "warm_cache": response_cache.status(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
 
 @app.get("/")
 async def root():
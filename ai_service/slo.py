@@ -0,0 +1,189 @@
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from query_router import QUERY_CLASSES
+
+NORMAL = 'normal'
+DEGRADED = 'degraded'
+SHEDDING = 'shedding'
+
+BUSY_MESSAGE = ("⏳ I'm handling a lot of questions right now! Please try again in a few seconds. "
+                "For urgent fee queries call the Finance Office: 040-23456789")
+
+
+class SLOController:
+    """Watches rolling upstream latency and in-flight load and decides when to stop calling remote APIs.
+
+    normal   -> remote APIs are used as usual; calls beyond max_upstream_in_flight get local answers
+    degraded -> upstream p95 breached the SLO; new requests get local answers only and one probe
+                every recovery_seconds checks the upstream
+    shedding -> too many requests in flight; the excess gets BUSY_MESSAGE without any work. Admitted
+                requests keep following the previous mode (remote calls or probes), and that
+                mode returns once load drains
+
+    Latency is tracked per query class, each against its own p95 target: a 400-token answer from
+    the large model is not slow just because it takes longer than a one-line greeting.
+    """
+
+    def __init__(self, p95_ms=None, window_seconds=60, min_samples=20, max_upstream_in_flight=8,
+                 shed_in_flight=64, recovery_seconds=30, upstream_timeout=8):
+        # Query class -> p95 target in ms
+        self.p95_ms = p95_ms or {name: plan['p95_ms'] for name, plan in QUERY_CLASSES.items()}
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.max_upstream_in_flight = max_upstream_in_flight
+        self.shed_in_flight = shed_in_flight
+        self.recovery_seconds = recovery_seconds
+        self.upstream_timeout = upstream_timeout
+
+        self.lock = threading.Lock()
+        self.samples = {name: deque() for name in self.p95_ms}  # query class -> (monotonic time, latency_ms, ok)
+        self.mode = NORMAL
+        self.mode_before_shedding = NORMAL
+        self.last_probe = 0.0
+        self.probe_in_flight = False
+        self.requests_in_flight = 0
+        self.upstream_in_flight = 0
+        self.shed_count = 0
+        self.transitions = deque(maxlen=20)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            p95_ms={name: float(os.getenv(f'SLO_P95_MS_{name.upper()}', plan['p95_ms']))
+                    for name, plan in QUERY_CLASSES.items()},
+            window_seconds=float(os.getenv('SLO_WINDOW_SECONDS', 60)),
+            min_samples=int(os.getenv('SLO_MIN_SAMPLES', 20)),
+            max_upstream_in_flight=int(os.getenv('SLO_MAX_UPSTREAM_IN_FLIGHT', 8)),
+            shed_in_flight=int(os.getenv('SLO_SHED_IN_FLIGHT', 64)),
+            recovery_seconds=float(os.getenv('SLO_RECOVERY_SECONDS', 30)),
+            upstream_timeout=float(os.getenv('SLO_UPSTREAM_TIMEOUT', 8)),
+        )
+
+    def _set_mode(self, mode, reason):
+        if mode == self.mode:
+            return
+        print(f"🚦 AI mode {self.mode} → {mode}: {reason}")
+        self.transitions.append({
+            'from': self.mode, 'to': mode, 'reason': reason, 'at': datetime.utcnow().isoformat()
+        })
+        previous, self.mode = self.mode, mode
+        if mode == DEGRADED and previous != SHEDDING:
+            # First recovery probe waits a full recovery period; coming back from shedding keeps the probe schedule
+            self.last_probe = time.monotonic()
+
+    def _base_mode(self):
+        """The latency-driven mode; shedding sits on top of it without changing it"""
+        return self.mode_before_shedding if self.mode == SHEDDING else self.mode
+
+    def _set_base_mode(self, mode, reason):
+        if self.mode != SHEDDING:
+            self._set_mode(mode, reason)
+            return
+        if mode != self.mode_before_shedding:
+            print(f"🚦 AI mode after shedding {self.mode_before_shedding} → {mode}: {reason}")
+            self.mode_before_shedding = mode
+            if mode == DEGRADED:
+                self.last_probe = time.monotonic()
+
+    def _trim(self, now):
+        for samples in self.samples.values():
+            while samples and now - samples[0][0] > self.window_seconds:
+                samples.popleft()
+
+    @staticmethod
+    def _p95(samples):
+        latencies = sorted(sample[1] for sample in samples)
+        if not latencies:
+            return 0.0
+        # Nearest rank, so with 20 samples the single slowest call is not the p95
+        return latencies[math.ceil(0.95 * len(latencies)) - 1]
+
+    def request_started(self):
+        """Count a chat request; returns False when it should be shed instead of served"""
+        with self.lock:
+            if self.requests_in_flight >= self.shed_in_flight:
+                self.shed_count += 1
+                if self.mode != SHEDDING:
+                    self.mode_before_shedding = self.mode
+                self._set_mode(SHEDDING, f"{self.requests_in_flight} requests in flight")
+                return False
+            self.requests_in_flight += 1
+            return True
+
+    def request_finished(self):
+        with self.lock:
+            self.requests_in_flight -= 1
+            if self.mode == SHEDDING and self.requests_in_flight < self.shed_in_flight // 2:
+                # Shedding says nothing about upstream health, so go back to the mode before it
+                self._set_mode(self.mode_before_shedding, "load drained below half the shed limit")
+
+    def allow_remote(self):
+        """Ticket for a remote call: 'remote', 'probe' (degraded mode recovery check) or None for local only"""
+        with self.lock:
+            mode = self._base_mode()
+            if mode == NORMAL:
+                if self.upstream_in_flight >= self.max_upstream_in_flight:
+                    # Backpressure for this request only; the mode follows upstream latency, not bursts
+                    return None
+                self.upstream_in_flight += 1
+                return 'remote'
+
+            now = time.monotonic()
+            if mode == DEGRADED and not self.probe_in_flight and now - self.last_probe >= self.recovery_seconds:
+                self.probe_in_flight = True
+                self.last_probe = now
+                self.upstream_in_flight += 1
+                return 'probe'
+            return None
+
+    def timeout_for(self, query_class):
+        """Upstream timeout in seconds: upstream_timeout, raised for classes allowed a slower p95"""
+        return max(self.upstream_timeout, 2 * self.p95_ms.get(query_class, 0) / 1000)
+
+    def upstream_finished(self, ticket, latency_ms, ok, query_class='factual'):
+        """Record an upstream call made with a ticket from allow_remote; failures count as a full timeout"""
+        if not ok:
+            latency_ms = max(latency_ms, self.timeout_for(query_class) * 1000)
+        target = self.p95_ms.get(query_class, self.upstream_timeout * 1000)
+        with self.lock:
+            now = time.monotonic()
+            self.upstream_in_flight -= 1
+            samples = self.samples.setdefault(query_class, deque())
+
+            if ticket == 'probe':
+                self.probe_in_flight = False
+                if ok and latency_ms <= target:
+                    for window in self.samples.values():
+                        window.clear()
+                    samples.append((now, latency_ms, ok))
+                    self._set_base_mode(NORMAL, f"{query_class} probe answered in {latency_ms:.0f}ms")
+                return
+
+            samples.append((now, latency_ms, ok))
+            self._trim(now)
+            # Below min_samples a 'p95' is just the slowest call in the window
+            if self._base_mode() == NORMAL and len(samples) >= self.min_samples:
+                p95 = self._p95(samples)
+                if p95 > target:
+                    self._set_base_mode(DEGRADED, f"{query_class} upstream p95 {p95:.0f}ms > {target:.0f}ms")
+
+    def status(self):
+        with self.lock:
+            self._trim(time.monotonic())
+            return {
+                'mode': self.mode,
+                'upstream_p95_ms': {name: round(self._p95(samples), 1) for name, samples in self.samples.items()},
+                'upstream_samples': {name: len(samples) for name, samples in self.samples.items()},
+                'requests_in_flight': self.requests_in_flight,
+                'upstream_in_flight': self.upstream_in_flight,
+                'shed_total': self.shed_count,
+                'transitions': list(self.transitions),
+            }
+
+
+slo_controller = SLOController.from_env()
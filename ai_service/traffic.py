@@ -0,0 +1,125 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import secrets
+import threading
+import time
+import zlib
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+# Phone, registration and card numbers: 6+ digits, optionally split by spaces or dashes
+NUMBER_RE = re.compile(r"\d(?:[\s-]?\d){5,}")
+
+
+def anonymize_message(message, user_data=None):
+    """Mask emails, long numbers and the user's own name in a chat message"""
+    message = EMAIL_RE.sub('<email>', message)
+    message = NUMBER_RE.sub('<number>', message)
+    name = (user_data or {}).get('name')
+    if isinstance(name, str):
+        for part in name.split():
+            if len(part) > 2:
+                message = re.sub(rf"\b{re.escape(part)}\b", '<name>', message, flags=re.IGNORECASE)
+    return message
+
+
+def capture_path(path):
+    """Per-process file for a capture base path: capture.jsonl.gz -> capture-20250301T101500-4242.jsonl.gz"""
+    suffix = f"-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    directory, filename = os.path.split(path)
+    stem, dot, ext = filename.partition('.')
+    return os.path.join(directory, f"{stem}{suffix}{dot}{ext}")
+
+
+def read_records(path):
+    """Yield records from a (optionally gzip-compressed) JSONL capture or replay file.
+
+    A process killed mid-write leaves the gzip stream without its end marker and a partial
+    last line; reading stops there and keeps every complete record before it.
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        try:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                if line.strip():
+                    yield json.loads(line)
+        except (EOFError, zlib.error):
+            print(f"⚠️ {path} is truncated; read up to the last complete record")
+
+
+class TrafficRecorder:
+    """Appends anonymized chat requests with timing and routing to a gzip JSONL file.
+
+    Covers /api/chat requests and /ws/chat messages (one record per message id, 'ts' being
+    when the frame arrived), so moving clients to WebSockets does not empty the capture.
+
+    Opt-in: only created when TRAFFIC_CAPTURE_PATH is set. Each process writes its own file
+    next to that path (see capture_path), so a crash can only truncate the file it was writing.
+    User identity is replaced by a salted hash, so one user's queries can be grouped without
+    storing who they are.
+    """
+
+    def __init__(self, path, salt=None, sample_rate=1.0, flush_every=100):
+        self.path = path
+        self.salt = salt or secrets.token_hex(16)
+        self.sample_rate = sample_rate
+        self.flush_every = flush_every
+        self.lock = threading.Lock()
+        self.file = gzip.open(path, 'wt', encoding='utf-8')
+        self.pending = 0
+        self.count = 0
+        print(f"📼 Recording chat traffic to {path}")
+
+    @classmethod
+    def from_env(cls):
+        path = os.getenv('TRAFFIC_CAPTURE_PATH')
+        if not path:
+            return None
+        return cls(
+            capture_path(path),
+            salt=os.getenv('TRAFFIC_CAPTURE_SALT'),
+            sample_rate=float(os.getenv('TRAFFIC_CAPTURE_SAMPLE', 1.0)),
+        )
+
+    def user_hash(self, user_data):
+        if not user_data:
+            return None
+        identity = user_data.get('email') or user_data.get('_id') or user_data.get('id') or user_data.get('name')
+        if not identity:
+            return None
+        return hashlib.sha256(f"{self.salt}:{identity}".encode()).hexdigest()[:12]
+
+    def record(self, message, role, user_data, arrived, latency_ms, route, status):
+        """Store one request; arrived is its wall-clock arrival time, which replay schedules from"""
+        if self.sample_rate < 1.0 and secrets.randbelow(10_000) >= self.sample_rate * 10_000:
+            return
+        entry = {
+            'ts': round(arrived, 3),
+            'message': anonymize_message(message, user_data),
+            'role': role,
+            'user': self.user_hash(user_data),
+            'latency_ms': round(latency_ms, 2),
+            'route': route,
+            'status': status,
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.file.write(line)
+            self.count += 1
+            self.pending += 1
+            if self.pending >= self.flush_every:
+                # Sync flush so a crash loses at most the last flush_every records; earlier ones stay readable
+                self.file.flush()
+                self.pending = 0
+
+    def close(self):
+        with self.lock:
+            self.file.close()
+        print(f"📼 Recorded {self.count} chat requests to {self.path}")
+
+
+traffic_recorder = TrafficRecorder.from_env()
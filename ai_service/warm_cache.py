@@ -0,0 +1,133 @@
+"""Precompute answers for the most frequent recorded queries into a warm-start snapshot.
+
+Usage:
+    # Answer the top 200 captured queries through the normal pipeline, at most 1 per second
+    python warm_cache.py capture-*.jsonl.gz --top 200 --rate 1 --out warm_cache.json.gz
+
+    # Check how much of another capture (e.g. last deadline week) the snapshot would cover
+    python warm_cache.py capture-*.jsonl.gz --coverage-of deadline_week.jsonl.gz
+
+    # Serve from the snapshot
+    WARM_CACHE_PATH=warm_cache.json.gz python server.py
+
+Captures are TRAFFIC_CAPTURE_PATH output (one file per server process). Queries are grouped by
+role and normalized text. Only answers that came back from the remote API are stored; they are
+generated without a user name, since every user gets the same cached text. Queries the local
+intents already answer are skipped. The service drops snapshots older than
+WARM_CACHE_MAX_AGE_HOURS (default 168).
+"""
+import argparse
+import re
+import time
+from collections import Counter, defaultdict
+
+from intent_matcher import normalize
+from response_cache import ANONYMOUS_USER, ResponseCache, response_cache
+from traffic import read_records
+
+# Anonymized parts never match a live query, so those messages are not worth warming
+PLACEHOLDER_RE = re.compile(r"<(?:email|number|name)>")
+
+
+def query_counts(paths):
+    """Request count and most common original wording per (role, normalized query)"""
+    counts = Counter()
+    wordings = defaultdict(Counter)
+    for path in paths:
+        for record in read_records(path):
+            message = record.get("message") or ""
+            text = normalize(message)
+            if not text:
+                continue
+            key = (record.get("role") or "student", text)
+            counts[key] += 1
+            wordings[key][message.strip()] += 1
+    return counts, wordings
+
+
+def local_queries(ai, wordings):
+    """Normalized queries the local intents answer without the upstream"""
+    return {key for key, options in wordings.items() if ai.local_intent(options.most_common(1)[0][0])}
+
+
+def report_coverage(label, counts, warmed, local):
+    total = sum(counts.values())
+    if not total:
+        print(f"   {label}: no queries")
+        return
+    cached = sum(count for key, count in counts.items() if key in warmed)
+    answered = sum(count for key, count in counts.items() if key in local)
+    print(f"📈 Coverage of {label}: {total} requests, {len(counts)} distinct queries")
+    print(f"   warm cache     {cached / total * 100:5.1f}% of requests "
+          f"({sum(1 for key in counts if key in warmed)} queries)")
+    print(f"   local intents  {answered / total * 100:5.1f}% of requests")
+    print(f"   no upstream    {(cached + answered) / total * 100:5.1f}% of requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Warm the response cache from recorded traffic")
+    parser.add_argument("captures", nargs="+", help="capture files (JSONL, optionally .gz)")
+    parser.add_argument("--top", type=int, default=200, help="number of most frequent queries to precompute")
+    parser.add_argument("--min-count", type=int, default=2, help="skip queries seen fewer times")
+    parser.add_argument("--rate", type=float, default=1.0, help="upstream calls per second")
+    parser.add_argument("--out", default="warm_cache.json.gz")
+    parser.add_argument("--coverage-of", nargs="+", help="also report coverage of these capture files")
+    args = parser.parse_args()
+    if not args.rate > 0:
+        parser.error("--rate must be positive")
+
+    from gemini_ai import gemini_ai
+    if not gemini_ai.active_api:
+        raise SystemExit("No remote API available; nothing to precompute")
+    # Answers must come from the upstream, not from a previously loaded snapshot
+    response_cache.clear()
+
+    counts, wordings = query_counts(args.captures)
+    candidates = [(key, count) for key, count in counts.most_common()
+                  if count >= args.min_count and not PLACEHOLDER_RE.search(wordings[key].most_common(1)[0][0])]
+
+    local = local_queries(gemini_ai, wordings)
+    entries, failed = {}, Counter()
+    start = time.monotonic()
+    calls = 0
+    for key, count in candidates:
+        if len(entries) >= args.top:
+            break
+        if key in local:
+            continue
+        message = wordings[key].most_common(1)[0][0]
+
+        # Throttle to --rate so warming never competes with live traffic for provider quota
+        delay = start + calls / args.rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        calls += 1
+        role, text = key
+        response, route = gemini_ai.respond(message, role, ANONYMOUS_USER)
+        if route.startswith("remote:"):
+            entries[key] = {"role": role, "key": text, "message": message, "response": response, "count": count}
+        else:
+            failed[route] += 1
+        if calls % 25 == 0:
+            print(f"   {calls} upstream calls, {len(entries)} answers stored")
+
+    meta = {
+        "created": round(time.time(), 3),
+        "api": gemini_ai.active_api,
+        "captures": args.captures,
+        "requests": sum(counts.values()),
+    }
+    ResponseCache.save(args.out, list(entries.values()), meta)
+    print(f"🔥 Stored {len(entries)} warm answers in {args.out} "
+          f"({calls} upstream calls in {time.monotonic() - start:.0f}s, {len(local)} queries already answered locally)")
+    for route, count in failed.items():
+        print(f"   {count} queries not stored ({route})")
+
+    report_coverage("captures", counts, entries, local)
+    if args.coverage_of:
+        eval_counts, eval_wordings = query_counts(args.coverage_of)
+        report_coverage("coverage set", eval_counts, entries, local_queries(gemini_ai, eval_wordings))
+
+
+if __name__ == "__main__":
+    main()